@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Compare the old per-call date parsing with the shared precompiled/memoized parser.
+
+Usage: python3 benchmarks/bench_date_parsing.py [--repeat N] [--passes N]
+Runs without a browser; the corpus is benchmarks/fixtures/date_strings.txt.
+"""
+import argparse
+import os
+from datetime import datetime
+from bench_utils import FIXTURES, timed
+from date_parsing import parse_estonian_date, parse_absolute_date
+
+def load_corpus():
+    with open(os.path.join(FIXTURES, 'date_strings.txt'), encoding='utf-8') as f:
+        return [line.rstrip('\n') for line in f if line.strip() and not line.startswith('#')]
+
+def legacy_parse_card_date(date_text):
+    """Old ArrowDownloadHandler.parse_card_date: month dict rebuilt per call, today on failure"""
+    try:
+        months = {
+            'jaanuar': 1, 'veebruar': 2, 'märts': 3, 'aprill': 4,
+            'mai': 5, 'juuni': 6, 'juuli': 7, 'august': 8,
+            'september': 9, 'oktoober': 10, 'november': 11, 'detsember': 12
+        }
+        parts = date_text.split(', ')[1].split(' ')
+        return datetime(int(parts[2]), months.get(parts[1].lower(), 1), int(parts[0]))
+    except Exception:
+        return datetime.now()
+
+def legacy_page_date(date_text):
+    """Old EliisScraper.extract_date_from_page inner loop for one element's text"""
+    for fmt in ["%d. %B %Y", "%d.%m.%Y", "%Y-%m-%d", "%d/%m/%Y"]:
+        try:
+            date_text = date_text.replace("jaanuar", "january").replace("veebruar", "february")
+            date_text = date_text.replace("märts", "march").replace("aprill", "april")
+            date_text = date_text.replace("mai", "may").replace("juuni", "june")
+            date_text = date_text.replace("juuli", "july").replace("august", "august")
+            date_text = date_text.replace("september", "september").replace("oktoober", "october")
+            date_text = date_text.replace("november", "november").replace("detsember", "december")
+            return datetime.strptime(date_text, fmt)
+        except:
+            continue
+    return datetime.now()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--passes', type=int, default=20,
+                        help="How often each string is parsed per run (cards are re-read on every page load)")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    work = corpus * args.passes
+    uncached = parse_absolute_date.__wrapped__
+
+    def run(func):
+        return lambda: [func(text) for text in work]
+
+    rows = [
+        ("legacy card parser", legacy_parse_card_date),
+        ("legacy page parser", legacy_page_date),
+        ("shared parser, no cache", uncached),
+        ("shared parser, cached", parse_estonian_date),
+    ]
+    print(f"{len(corpus)} date strings x {args.passes} passes")
+    for name, func in rows:
+        parse_absolute_date.cache_clear()
+        seconds, _ = timed(run(func), args.repeat)
+        print(f"{name:<26} {seconds * 1000:8.1f} ms  {seconds / len(work) * 1e6:6.2f} µs/string")
+
+    today = datetime.now().date()
+    guessed = sum(1 for text in corpus if legacy_parse_card_date(text).date() == today)
+    unread = [text for text in corpus if parse_estonian_date(text) is None]
+    print(f"\nLegacy card parser filed {guessed} strings under today's date")
+    print(f"Shared parser could not read {len(unread)}: {', '.join(repr(t) for t in unread)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Compare per-element WebDriver scraping with the single execute_script extraction.
+
+Usage: python3 benchmarks/bench_dom_extraction.py [--repeat N]
+Needs Firefox + geckodriver (set GECKODRIVER if it isn't on PATH).
+"""
+import argparse
+import os
+import tempfile
+from bench_utils import FIXTURES, start_headless_firefox, count_commands, timed
+from selenium.webdriver.common.by import By
+from arrow_download_handler import ArrowDownloadHandler
+
+def legacy_extract(handler):
+    """Old approach: find_elements plus per-card date and thumbnail lookups"""
+    result = []
+    for card in handler.driver.find_elements(By.CSS_SELECTOR, "div.card.p-3.mb-3"):
+        date = handler.extract_date_from_card(card)
+        thumbnails = card.find_elements(By.CSS_SELECTOR, ".e3-image-thumbnail")
+        result.append((date, len(thumbnails)))
+    return result
+
+def legacy_forward_arrow(driver):
+    """Old approach: walk every <button>, then its svg and path"""
+    for btn in driver.find_elements(By.TAG_NAME, "button"):
+        try:
+            path = btn.find_element(By.TAG_NAME, "svg").find_element(By.TAG_NAME, "path")
+            d_attr = path.get_attribute("d")
+            if d_attr and "M8.59,16.58L13.17,12" in d_attr:
+                return btn
+        except:
+            continue
+    return None
+
+def batch_extract(handler):
+    """New approach: one execute_script for all cards"""
+    return [(handler.parse_card_date(c['date_text']), c['thumbnail_count']) for c in handler.extract_cards()]
+
+def measure(name, func, driver, counter, repeat):
+    """Print best time and WebDriver calls per run"""
+    counter['calls'] = 0
+    seconds, result = timed(func, repeat)
+    calls = counter['calls'] // repeat
+    print(f"{name:<28} {seconds * 1000:8.1f} ms  {calls:6d} WebDriver calls")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    driver = start_headless_firefox()
+    try:
+        driver.get("file://" + os.path.join(FIXTURES, 'diary_page.html'))
+        config = {'download_path': tempfile.mkdtemp(prefix="eliis-bench-")}
+        handler = ArrowDownloadHandler(driver, config)
+        counter = count_commands(driver)
+
+        old = measure("cards: per-element", lambda: legacy_extract(handler), driver, counter, args.repeat)
+        new = measure("cards: execute_script", lambda: batch_extract(handler), driver, counter, args.repeat)
+        measure("arrow: per-element", lambda: legacy_forward_arrow(driver), driver, counter, args.repeat)
+        measure("arrow: execute_script", handler.has_forward_arrow, driver, counter, args.repeat)
+
+        print(f"\n{len(new)} cards, results {'match' if old == new else 'DIFFER'}")
+    finally:
+        driver.quit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""End-to-end throughput of EliisScraper + ArrowDownloadHandler against the mock server.
+
+Reports photos/sec, seconds per date and WebDriver calls per photo for each
+download mode. Save results with --save and fail on regressions with
+--compare baseline.json (exit code 1 if photos/sec drops more than --tolerance).
+
+Usage: python3 benchmarks/bench_pipeline.py [--dates 12] [--modes http,browser]
+Needs Firefox + geckodriver (set GECKODRIVER if it isn't on PATH).
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from bench_utils import count_commands
+from mock_eliis_server import MockEliisServer
+from firefox_session import get_firefox_driver
+from download_session import DownloadSession
+
+def make_config(server, mode, workdir):
+    """Config pointing the downloader at the mock server"""
+    return {
+        'firefox_profile_path': os.path.join(workdir, 'profile'),
+        'base_url': server.url,
+        'children': [{'name': f"Child {cid}", 'id': cid, 'folder_name': f"child_{cid}"}
+                     for cid in server.diaries],
+        'download_path': os.path.join(workdir, 'downloads'),
+        'download_mode': 'browser' if mode == 'browser' else 'http',
+        'download_engine': 'asyncio' if mode == 'http-async' else 'threads',
+        'discovery_mode': {'http-grid': 'grid', 'http-network': 'network'}.get(mode, 'viewer'),
+        'headless': True,
+        'geckodriver_path': os.environ.get('GECKODRIVER'),
+        'skip_existing': True,
+    }
+
+def run_mode(server, mode):
+    """One full run in a fresh profile and download directory"""
+    workdir = tempfile.mkdtemp(prefix=f"eliis-bench-{mode}-")
+    config = make_config(server, mode, workdir)
+    os.makedirs(config['firefox_profile_path'])
+    browser_download_dir = os.path.join(workdir, 'browser-downloads')
+    os.makedirs(browser_download_dir)
+
+    driver = get_firefox_driver(config['firefox_profile_path'], download_dir=browser_download_dir, config=config)
+    try:
+        session = DownloadSession(driver, config, browser_download_dir)
+        counter = count_commands(driver)
+        started = time.time()
+        downloaded = session.run()
+        seconds = time.time() - started
+    finally:
+        driver.quit()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'mode': mode,
+        'photos': downloaded,
+        'seconds': seconds,
+        'photos_per_sec': downloaded / seconds if seconds else 0,
+        'seconds_per_date': seconds / server.total_dates,
+        'webdriver_calls_per_photo': counter['calls'] / max(1, server.total_photos),
+    }
+
+def run_pagination(server):
+    """EliisScraper alone: navigate and load every diary page"""
+    workdir = tempfile.mkdtemp(prefix="eliis-bench-pages-")
+    config = make_config(server, 'http', workdir)
+    os.makedirs(config['firefox_profile_path'])
+    driver = get_firefox_driver(config['firefox_profile_path'], config=config)
+    try:
+        session = DownloadSession(driver, config)
+        counter = count_commands(driver)
+        started = time.time()
+        for child in config['children']:
+            session.scraper.navigate_to_child_diary(child['id'])
+            while session.scraper.click_load_older_diaries():
+                pass
+        seconds = time.time() - started
+    finally:
+        driver.quit()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'mode': 'scraper-pagination',
+        'photos': 0,
+        'seconds': seconds,
+        'photos_per_sec': 0,
+        'seconds_per_date': seconds / server.total_dates,
+        'webdriver_calls_per_photo': counter['calls'] / max(1, server.total_photos),
+    }
+
+def print_results(results):
+    print(f"\n{'mode':<20} {'photos':>6} {'seconds':>8} {'photos/s':>9} {'s/date':>7} {'calls/photo':>12}")
+    for r in results:
+        print(f"{r['mode']:<20} {r['photos']:>6} {r['seconds']:>8.1f} {r['photos_per_sec']:>9.2f} "
+              f"{r['seconds_per_date']:>7.2f} {r['webdriver_calls_per_photo']:>12.1f}")
+
+def compare(results, baseline_path, tolerance):
+    """Return list of regressions against a saved baseline"""
+    with open(baseline_path, 'r') as f:
+        baseline = {r['mode']: r for r in json.load(f)['results']}
+    regressions = []
+    for r in results:
+        old = baseline.get(r['mode'])
+        if not old:
+            continue
+        if old['photos_per_sec'] and r['photos_per_sec'] < old['photos_per_sec'] * (1 - tolerance):
+            regressions.append(f"{r['mode']}: {r['photos_per_sec']:.2f} photos/s (baseline {old['photos_per_sec']:.2f})")
+        if r['seconds_per_date'] > old['seconds_per_date'] * (1 + tolerance):
+            regressions.append(f"{r['mode']}: {r['seconds_per_date']:.2f} s/date (baseline {old['seconds_per_date']:.2f})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modes', default='http,http-async,http-grid,http-network,browser')
+    parser.add_argument('--dates', type=int, default=12)
+    parser.add_argument('--photos-per-date', type=int, default=5)
+    parser.add_argument('--page-size', type=int, default=5)
+    parser.add_argument('--image-size', type=int, default=200 * 1024)
+    parser.add_argument('--image-latency', type=float, default=0.05)
+    parser.add_argument('--page-latency', type=float, default=0.1)
+    parser.add_argument('--save', help="Write results JSON here")
+    parser.add_argument('--compare', help="Baseline results JSON")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    server = MockEliisServer(
+        dates=args.dates, photos_per_date=args.photos_per_date, page_size=args.page_size,
+        image_size=args.image_size, image_latency=args.image_latency, page_latency=args.page_latency
+    ).start()
+    print(f"Mock server at {server.url}: {server.total_dates} dates, {server.total_photos} photos")
+    try:
+        results = [run_pagination(server)]
+        for mode in args.modes.split(','):
+            results.append(run_mode(server, mode))
+    finally:
+        server.stop()
+
+    print_results(results)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'params': vars(args), 'results': results}, f, indent=2)
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
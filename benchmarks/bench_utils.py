@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+
+# Benchmarks import the same modules as download_pics_from_eliis.py
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+def start_headless_firefox():
+    """Start a throwaway headless Firefox (no user profile)"""
+    from selenium import webdriver
+    from selenium.webdriver.firefox.options import Options
+    from selenium.webdriver.firefox.service import Service
+
+    options = Options()
+    options.add_argument("-headless")
+    geckodriver = os.environ.get('GECKODRIVER')
+    service = Service(geckodriver) if geckodriver else Service()
+    return webdriver.Firefox(service=service, options=options)
+
+def count_commands(driver):
+    """Count WebDriver round-trips made through driver (and its elements)"""
+    original = driver.execute
+    counter = {'calls': 0}
+
+    def execute(command, params=None):
+        counter['calls'] += 1
+        return original(command, params)
+
+    driver.execute = execute
+    return counter
+
+def timed(func, repeat=5):
+    """Best wall time of `repeat` runs and the last result"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
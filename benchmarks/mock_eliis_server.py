@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""Local stand-in for eliis.eu diary pages, for offline benchmarks.
+
+Serves /child/<id>/diary with the markup the downloader expects (diary cards,
+Estonian dates, thumbnails, photo viewer with SVG arrows and download button,
+'Kuva rohkem' and 'Vaata vanemaid päevikuid' buttons), the JSON behind it, and
+synthetic JPEGs with configurable latency and size under /cloudfront/.
+
+Usage: python3 benchmarks/mock_eliis_server.py [--port 8765] [--dates 12] ...
+"""
+import argparse
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+MONTHS = ['jaanuar', 'veebruar', 'märts', 'aprill', 'mai', 'juuni', 'juuli',
+          'august', 'september', 'oktoober', 'november', 'detsember']
+WEEKDAYS = ['esmaspäev', 'teisipäev', 'kolmapäev', 'neljapäev', 'reede', 'laupäev', 'pühapäev']
+
+# 1x1 baseline JPEG; padded with comment segments to the requested size
+TINY_JPEG = base64.b64decode(
+    "/9j/4AAQSkZJRgABAQEASABIAAD/2wBDAP//////////////////////////////////////////"
+    "////////////////////////////////////////////wgALCAABAAEBAREA/8QAFBABAAAAAAAAAA"
+    "AAAAAAAAAAAP/aAAgBAQABPxA="
+) + b"\xff\xd9"
+
+VISIBLE_THUMBNAILS = 6
+
+def estonian_date_text(day):
+    """Date as shown on diary cards, e.g. 'reede, 30 mai 2025'"""
+    return f"{WEEKDAYS[day.weekday()]}, {day.day} {MONTHS[day.month - 1]} {day.year}"
+
+def synthetic_jpeg(key, size):
+    """Valid JPEG of roughly `size` bytes with content unique to `key`"""
+    seed = hashlib.sha256(key.encode()).digest()
+    padding = b''
+    remaining = max(0, size - len(TINY_JPEG))
+    while remaining > 4:
+        chunk = min(remaining - 4, 65533)
+        body = (seed * (chunk // len(seed) + 1))[:chunk]
+        padding += b'\xff\xfe' + (chunk + 2).to_bytes(2, 'big') + body
+        remaining -= chunk + 4
+    return TINY_JPEG[:2] + padding + TINY_JPEG[2:]
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="et">
+<head>
+<meta charset="utf-8">
+<title>Päevik</title>
+<style>
+  .e3-image-thumbnail { width: 80px; height: 80px; display: inline-block; background: #ccc center/cover; cursor: pointer; }
+  .e3-viewer { position: fixed; inset: 0; background: rgba(0,0,0,.9); }
+  .e3-viewer img.e3-img-full { display: block; width: 600px; height: 400px; margin: 40px auto; }
+  .d-none { display: none !important; }
+</style>
+</head>
+<body>
+<div class="container">
+  <div id="cards"></div>
+  <button id="older" class="position-relative btn d-none">Vaata vanemaid päevikuid</button>
+</div>
+<div id="viewer" class="e3-viewer d-none">
+  <i class="mdi mdi-close" id="close">x</i>
+  <i class="mdi mdi-download" id="download">v</i>
+  <img class="e3-img-full" id="full" alt="">
+  <span id="arrows"></span>
+</div>
+<script>
+const CHILD = "__CHILD__";
+const VISIBLE = __VISIBLE__;
+const ARROW = 'M8.59,16.58L13.17,12L8.59,7.41L10,6L16,12L10,18L8.59,16.58Z';
+let page = 0;
+let current = null;
+
+function thumb(entry, i) {
+  const el = document.createElement('div');
+  el.className = 'e3-image-thumbnail';
+  el.style.backgroundImage = `url(${entry.photos[i].thumb})`;
+  el.onclick = () => openViewer(entry, i);
+  return el;
+}
+
+function card(entry) {
+  const el = document.createElement('div');
+  el.className = 'card p-3 mb-3';
+  el.dataset.entryId = entry.id;
+  el.innerHTML = `<div class="text-muted">${entry.date_text}</div><p>${entry.text}</p><div class="thumbs"></div>`;
+  const thumbs = el.querySelector('.thumbs');
+  entry.photos.slice(0, VISIBLE).forEach((_, i) => thumbs.appendChild(thumb(entry, i)));
+  if (entry.photos.length > VISIBLE) {
+    const more = document.createElement('button');
+    more.className = 'btn';
+    more.textContent = 'Kuva rohkem';
+    more.onclick = () => {
+      entry.photos.slice(VISIBLE).forEach((_, i) => thumbs.appendChild(thumb(entry, VISIBLE + i)));
+      more.remove();
+    };
+    el.appendChild(more);
+  }
+  return el;
+}
+
+function openViewer(entry, i) {
+  current = {entry, i};
+  document.getElementById('full').src = entry.photos[i].url;
+  const arrows = document.getElementById('arrows');
+  arrows.innerHTML = '';
+  if (i < entry.photos.length - 1) {
+    const next = document.createElement('button');
+    next.className = 'btn';
+    next.innerHTML = `<svg viewBox="0 0 24 24" width="24" height="24"><path d="${ARROW}"></path></svg>`;
+    next.onclick = () => openViewer(entry, i + 1);
+    arrows.appendChild(next);
+  }
+  document.getElementById('viewer').classList.remove('d-none');
+}
+
+document.getElementById('close').onclick = () => {
+  document.getElementById('viewer').classList.add('d-none');
+  document.getElementById('full').removeAttribute('src');
+  current = null;
+};
+
+document.getElementById('download').onclick = () => {
+  const a = document.createElement('a');
+  a.href = current.entry.photos[current.i].url + '?download=1';
+  a.download = '';
+  document.body.appendChild(a);
+  a.click();
+  a.remove();
+};
+
+async function loadPage() {
+  const response = await fetch(`/api/child/${CHILD}/diary?page=${page}`);
+  const data = await response.json();
+  const cards = document.getElementById('cards');
+  data.entries.forEach(entry => cards.appendChild(card(entry)));
+  page += 1;
+  document.getElementById('older').classList.toggle('d-none', !data.has_more);
+}
+
+document.getElementById('older').onclick = loadPage;
+loadPage();
+</script>
+</body>
+</html>
+"""
+
+class MockEliisServer:
+    def __init__(self, children=('1001',), dates=12, photos_per_date=5, page_size=5,
+                 image_size=200 * 1024, image_latency=0.05, page_latency=0.1,
+                 start_date=date(2025, 5, 30), port=0):
+        """Diary data generated up front; every child gets the same shape of history"""
+        self.image_size = image_size
+        self.image_latency = image_latency
+        self.page_latency = page_latency
+        self.page_size = page_size
+        self.port = port
+        self.requests = {'pages': 0, 'api': 0, 'images': 0, 'image_bytes': 0}
+        self.lock = threading.Lock()
+        self.diaries = {}
+        for child_id in children:
+            entries = []
+            for n in range(dates):
+                day = start_date - timedelta(days=n)
+                # Vary the photo count a little so dates differ
+                count = max(1, photos_per_date + (n % 3) - 1)
+                photos = [{
+                    'id': f"{child_id}-{day:%Y%m%d}-{i}",
+                    'url': f"/cloudfront/{child_id}/{day:%Y%m%d}/{i:04d}.jpg",
+                    'thumb': f"/cloudfront/{child_id}/{day:%Y%m%d}/{i:04d}_thumb.jpg",
+                } for i in range(count)]
+                entries.append({
+                    'id': f"{child_id}-{n}",
+                    'date': day.isoformat(),
+                    'date_text': estonian_date_text(day),
+                    'text': f"Päevik {n + 1}",
+                    'photos': photos,
+                })
+            self.diaries[str(child_id)] = entries
+        self.httpd = None
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    @property
+    def total_photos(self):
+        return sum(len(e['photos']) for entries in self.diaries.values() for e in entries)
+
+    @property
+    def total_dates(self):
+        return sum(len(entries) for entries in self.diaries.values())
+
+    def absolute(self, entries):
+        """Entries with absolute image URLs"""
+        result = []
+        for entry in entries:
+            entry = dict(entry)
+            entry['photos'] = [{k: (self.url + v if k in ('url', 'thumb') else v) for k, v in p.items()}
+                               for p in entry['photos']]
+            result.append(entry)
+        return result
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.requests[key] += amount
+
+    def start(self):
+        """Serve in a background thread"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def send(self, status, body, content_type, extra_headers=None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (extra_headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(body)
+
+            def do_HEAD(self):
+                self.do_GET()
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                match = re.fullmatch(r'/child/(\w+)/diary', parsed.path)
+                if match and match.group(1) in server.diaries:
+                    server.count('pages')
+                    html = PAGE_TEMPLATE.replace('__CHILD__', match.group(1))
+                    html = html.replace('__VISIBLE__', str(VISIBLE_THUMBNAILS))
+                    return self.send(200, html.encode(), 'text/html; charset=utf-8')
+
+                match = re.fullmatch(r'/api/child/(\w+)/diary', parsed.path)
+                if match and match.group(1) in server.diaries:
+                    server.count('api')
+                    time.sleep(server.page_latency)
+                    page = int(parse_qs(parsed.query).get('page', ['0'])[0])
+                    entries = server.diaries[match.group(1)]
+                    chunk = entries[page * server.page_size:(page + 1) * server.page_size]
+                    body = json.dumps({
+                        'entries': server.absolute(chunk),
+                        'has_more': (page + 1) * server.page_size < len(entries),
+                    }).encode()
+                    return self.send(200, body, 'application/json')
+
+                if parsed.path.startswith('/cloudfront/') and parsed.path.endswith('.jpg'):
+                    server.count('images')
+                    time.sleep(server.image_latency)
+                    size = 4 * 1024 if parsed.path.endswith('_thumb.jpg') else server.image_size
+                    body = synthetic_jpeg(parsed.path, size)
+                    server.count('image_bytes', len(body))
+                    headers = {'Cache-Control': 'no-store'}
+                    if 'download=1' in parsed.query:
+                        name = parsed.path.rsplit('/', 1)[1]
+                        headers['Content-Disposition'] = f'attachment; filename="{name}"'
+                    return self.send(200, body, 'image/jpeg', headers)
+
+                self.send(404, b'not found', 'text/plain')
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock eliis.eu diary server")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--children', default='1001', help="Comma separated child ids")
+    parser.add_argument('--dates', type=int, default=12)
+    parser.add_argument('--photos-per-date', type=int, default=5)
+    parser.add_argument('--page-size', type=int, default=5)
+    parser.add_argument('--image-size', type=int, default=200 * 1024)
+    parser.add_argument('--image-latency', type=float, default=0.05)
+    parser.add_argument('--page-latency', type=float, default=0.1)
+    args = parser.parse_args()
+
+    server = MockEliisServer(
+        children=args.children.split(','), dates=args.dates, photos_per_date=args.photos_per_date,
+        page_size=args.page_size, image_size=args.image_size, image_latency=args.image_latency,
+        page_latency=args.page_latency, port=args.port
+    ).start()
+    print(f"Serving mock diaries at {server.url}/child/<id>/diary (Ctrl-C to stop)")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
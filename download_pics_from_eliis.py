@@ -1,16 +1,23 @@
 #!/usr/bin/env python3
 import json
+import argparse
 import sys
 import os
+import shutil
 from colorama import init, Fore
 from datetime import datetime
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from firefox_session import get_firefox_driver
-from arrow_download_handler import ArrowDownloadHandler
-from scraper import EliisScraper
+from firefox_session import get_firefox_driver, create_run_download_dir, get_browser_peak_memory_mb
+from download_session import DownloadSession
+from parallel_runner import ParallelRunner
+from waits import WaitStats
+from metrics import RunMetrics
+from archive_index import ArchiveIndex
+from planner import RunPlanner
+from browser_daemon import attach_to_daemon, BrowserLock, close_driver, cookie_jar_expired, export_cookies, run_daemon
 
 init(autoreset=True)  # Initialize colorama
 
@@ -32,43 +39,219 @@ def print_banner():
     print(f"{Fore.CYAN}{'='*50}\n")
 
 
+def iso_date(value):
+    """argparse type for YYYY-MM-DD dates"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}")
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Download all photos from eliis.eu")
+    parser.add_argument('--browsers', type=int, default=None,
+                        help="Run up to N browsers in parallel, one per child")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue an interrupted run from its checkpoint")
+    parser.add_argument('--headless', action='store_true',
+                        help="Run Firefox without a window, with fonts/animations/trackers turned off")
+    parser.add_argument('--since', type=iso_date, metavar='YYYY-MM-DD',
+                        help="Only diary entries from this date on; older pages are not loaded")
+    parser.add_argument('--until', type=iso_date, metavar='YYYY-MM-DD',
+                        help="Only diary entries up to this date")
+    parser.add_argument('--since-last-sync', action='store_true',
+                        help="Only entries added since the last finished run (nightly sync)")
+    parser.add_argument('--metrics-out', metavar='PATH',
+                        help="Write run timings here (.jsonl, or .prom for Prometheus text)")
+    parser.add_argument('--daemon', action='store_true',
+                        help="Keep a logged-in Firefox running for later runs to attach to")
+    parser.add_argument('--plan', action='store_true',
+                        help="Count new photos and estimate size and time without downloading")
+    parser.add_argument('--archive-status', action='store_true',
+                        help="Show what's already downloaded per child and exit (no browser)")
+    return parser.parse_args()
+
+def apply_cli_options(config, args):
+    """Command line options override config.json"""
+    if args.resume:
+        config['resume'] = True
+    if args.browsers:
+        config['parallel_browsers'] = args.browsers
+    if args.headless:
+        config['headless'] = True
+    if args.since:
+        config['since'] = args.since
+    if args.until:
+        config['until'] = args.until
+    if args.since_last_sync:
+        config['since_last_sync'] = True
+    if args.metrics_out:
+        config['metrics_file'] = args.metrics_out
+
+def print_archive_status(config):
+    """Latest complete date, photos per month and incomplete dates, read from the archive index"""
+    archive = ArchiveIndex(config.get('download_path', 'downloads'))
+    for child in config['children']:
+        name = child['folder_name']
+        print(f"\n{Fore.CYAN}{child['name']} ({name})")
+        print(f"  Synced up to: {archive.latest_synced_date(name) or 'nothing yet'}")
+        for month, count in archive.count_per_month(name).items():
+            print(f"  {month}: {count} photos")
+        for date_str in archive.incomplete_dates(name):
+            missing = archive.missing_indices(name, date_str)
+            print(f"  {Fore.YELLOW}Incomplete {date_str}: missing photos {', '.join(map(str, missing))}")
+
+def export_metrics(config, metrics):
+    """Write phase timings at the end of a run"""
+    path = config.get('metrics_file') or os.path.join(
+        config.get('download_path', 'downloads'), '.metrics',
+        f"run-{datetime.now().strftime('%Y%m%d-%H%M%S')}.jsonl"
+    )
+    try:
+        metrics.export(path)
+        print(f"Run metrics written to {path}")
+    except OSError as e:
+        print(f"{Fore.YELLOW}Could not write metrics: {e}")
+
+def browser_resource_line(startup_seconds, peak_memory_mb):
+    """Startup time and peak memory of one browser"""
+    memory = f"{peak_memory_mb:.0f} MB" if peak_memory_mb is not None else "unknown"
+    startup = f"{startup_seconds:.1f}s" if startup_seconds is not None else "unknown"
+    return f"Browser startup: {startup}, peak memory: {memory}"
+
+def print_summary(total, duration, lines, wait_stats, metrics):
+    """Print final run summary"""
+    print(f"\n{Fore.GREEN}{'='*50}")
+    print(f"{Fore.GREEN}Download complete!")
+    print(f"{Fore.GREEN}Total photos downloaded: {total}")
+    print(f"{Fore.GREEN}Time taken: {duration:.1f} seconds")
+    for line in lines:
+        print(f"{Fore.GREEN}{line}")
+    print(f"{Fore.GREEN}{'='*50}\n")
+    
+    print(f"{Fore.CYAN}Time per phase:")
+    for line in metrics.summary_lines():
+        print(line)
+    
+    print(f"\n{Fore.CYAN}Browser wait times per step:")
+    for line in wait_stats.summary_lines():
+        print(line)
+
+def run_parallel(config, browsers):
+    """Download with one isolated browser per child"""
+    print(f"Starting up to {browsers} browsers in parallel...")
+    wait_stats = WaitStats()
+    metrics = RunMetrics()
+    runner = ParallelRunner(config, browsers, wait_stats=wait_stats, metrics=metrics)
+    start_time = datetime.now()
+    
+    try:
+        results = runner.run()
+    except KeyboardInterrupt:
+        print(f"\n{Fore.YELLOW}Download cancelled by user")
+        export_metrics(config, metrics)
+        return
+    if runner.logged_out.is_set():
+        print(f"{Fore.RED}Not logged in to eliis.eu. Log in in Firefox (or in the --daemon window) and run again.")
+    
+    lines = []
+    for result in results:
+        status = f"error: {result['error']}" if result['error'] else "ok"
+        lines.append(f"{result['child']}: {result['downloaded']} photos in {result['seconds']:.1f}s ({status})")
+        lines.append(f"    {browser_resource_line(result['startup_seconds'], result['peak_memory_mb'])}")
+        lines.extend(f"    {line}" for line in result['summary'])
+    
+    duration = (datetime.now() - start_time).total_seconds()
+    print_summary(sum(r['downloaded'] for r in results), duration, lines, wait_stats, metrics)
+    export_metrics(config, metrics)
+
 def main():
     print_banner()
+    args = parse_args()
     
     # Load configuration
     print("Loading configuration...")
     config = load_config()
+    apply_cli_options(config, args)
     
-    # Connect to Firefox
-    print(f"Connecting to Firefox profile...")
-    driver = get_firefox_driver(config['firefox_profile_path'])
+    if args.archive_status:
+        print_archive_status(config)
+        return
+    
+    if args.daemon:
+        run_daemon(config)
+        return
+    
+    expired = cookie_jar_expired(config)
+    if expired:
+        print(f"{Fore.YELLOW}Saved eliis.eu login expired on {expired:%Y-%m-%d %H:%M}, you'll probably need to log in again")
+    
+    browsers = config.get('parallel_browsers', 1)
+    if browsers > 1 and len(config['children']) > 1 and not args.plan:
+        run_parallel(config, browsers)
+        return
+    
+    # Attach to the warm daemon browser if one runs (see --daemon), else start Firefox
+    driver = attach_to_daemon(config) if config.get('attach_to_daemon', True) else None
+    if driver:
+        browser_download_dir = driver.download_dir
+    else:
+        print(f"Connecting to Firefox profile...")
+        # A plan downloads nothing, so it gets no download directory
+        browser_download_dir = None if args.plan else create_run_download_dir(config)
+        driver = get_firefox_driver(config['firefox_profile_path'], download_dir=browser_download_dir, config=config)
+    session = None
+    # Keeps the daemon from refreshing the page under us (a plan on its own browser needs no lock)
+    lock = BrowserLock(config) if not args.plan or getattr(driver, 'attached', False) else None
+    if lock:
+        lock.acquire()
     
     try:
-        # Initialize components
-        download_handler = ArrowDownloadHandler(driver, config)
-        scraper = EliisScraper(driver, config)
+        # Initialize components; a plan only reads, so it skips the download session
+        planner = RunPlanner(driver, config) if args.plan else None
+        if not planner:
+            session = DownloadSession(driver, config, browser_download_dir)
+        
+        # Stop before walking the diary if eliis wants a login
+        if not (planner or session).scraper.check_login():
+            print(f"{Fore.RED}Not logged in to eliis.eu. Log in in Firefox (or in the --daemon window) and run again.")
+            return
+        
+        if planner:
+            planner.run()
+            return
+        export_cookies(driver, config)
         
         # Start downloading
         start_time = datetime.now()
-        total = scraper.process_all_children(download_handler)
+        total = session.run()
         
         # Summary
         duration = (datetime.now() - start_time).total_seconds()
-        print(f"\n{Fore.GREEN}{'='*50}")
-        print(f"{Fore.GREEN}Download complete!")
-        print(f"{Fore.GREEN}Total photos downloaded: {total}")
-        print(f"{Fore.GREEN}Time taken: {duration:.1f} seconds")
-        print(f"{Fore.GREEN}{'='*50}\n")
+        lines = session.summary_lines()
+        lines.append(browser_resource_line(driver.startup_seconds, get_browser_peak_memory_mb(driver)))
+        print_summary(total, duration, lines, session.waiter.stats, session.metrics)
         
     except KeyboardInterrupt:
         print(f"\n{Fore.YELLOW}Download cancelled by user")
+        if session and session.pipeline:
+            print(f"{Fore.YELLOW}Stopping download workers...")
+            session.cancel()
+            print(f"{Fore.YELLOW}Photos downloaded before stop: {session.downloaded}")
     except Exception as e:
         print(f"\n{Fore.RED}Error: {e}")
         if config.get('debug_mode'):
             import traceback
             traceback.print_exc()
     finally:
-        driver.quit()
+        if session:
+            session.cancel()
+            export_metrics(config, session.metrics)
+        if lock:
+            lock.release()
+        close_driver(driver)
+        if browser_download_dir and not getattr(driver, 'attached', False):
+            shutil.rmtree(browser_download_dir, ignore_errors=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import threading
+
+INDEX_DIR = '.index'
+
+class ArchiveIndex:
+    def __init__(self, root, interval=30, read_only=False):
+        """Per-child, per-year JSON index of the download tree (root/child/.index/YYYY.json)
+
+        Each shard maps a date to the photo names expected in viewer order and the
+        photos on disk, so queries never walk or stat the photo folders.
+        With read_only, missing indexes are built in memory and never saved.
+        """
+        self.root = root
+        self.interval = interval
+        self.read_only = read_only
+        self.lock = threading.RLock()
+        self.shards = {}
+        self.dirty = set()
+        self.saved_at = time.time()
+        # Children whose index directory was looked for (and built if missing)
+        self.checked = set()
+
+    def shard_path(self, child, year):
+        return os.path.join(self.root, child, INDEX_DIR, f"{year}.json")
+
+    def prepare(self, child):
+        """Index a child's existing photos the first time it's touched without an index"""
+        with self.lock:
+            if child in self.checked:
+                return
+            self.checked.add(child)
+            if not os.path.isdir(os.path.join(self.root, child, INDEX_DIR)) and \
+                    os.path.isdir(os.path.join(self.root, child)):
+                self.rebuild(child)
+
+    def years(self, child):
+        """Years that have a shard for this child, newest first"""
+        self.prepare(child)
+        directory = os.path.join(self.root, child, INDEX_DIR)
+        names = set()
+        if os.path.isdir(directory):
+            names = {name[:-5] for name in os.listdir(directory) if name.endswith('.json')}
+        with self.lock:
+            names |= {year for (c, year) in self.shards if c == child}
+        return sorted(names, reverse=True)
+
+    def shard(self, child, year):
+        """Dates of one child and year, loaded on first use"""
+        key = (child, str(year))
+        with self.lock:
+            if key not in self.shards:
+                try:
+                    with open(self.shard_path(child, year), 'r') as f:
+                        self.shards[key] = json.load(f)
+                except (OSError, ValueError):
+                    self.shards[key] = {}
+            return self.shards[key]
+
+    def date_entry(self, child, date_str):
+        dates = self.shard(child, date_str[:4])
+        return dates.setdefault(date_str, {'expected': None, 'photos': {}})
+
+    def split_path(self, path):
+        """(child, date_str, filename) for a photo path inside the archive, or None"""
+        relative = os.path.relpath(path, self.root)
+        parts = relative.split(os.sep)
+        if len(parts) != 3 or parts[0].startswith('.'):
+            return None
+        return parts[0], parts[1], parts[2]
+
+    def add_photo(self, path, size=None, sha256=None):
+        """Record a photo that landed in root/child/YYYY-MM-DD/"""
+        parts = self.split_path(path)
+        if not parts:
+            return
+        child, date_str, filename = parts
+        self.prepare(child)
+        with self.lock:
+            self.date_entry(child, date_str)['photos'][filename] = {'size': size, 'sha256': sha256}
+            self.dirty.add((child, date_str[:4]))
+        self.save()
+
+    def remove_photo(self, path):
+        """Forget a photo that was renamed or deleted"""
+        parts = self.split_path(path)
+        if not parts:
+            return
+        child, date_str, filename = parts
+        self.prepare(child)
+        with self.lock:
+            self.date_entry(child, date_str)['photos'].pop(filename, None)
+            self.dirty.add((child, date_str[:4]))
+        self.save()
+
+    def set_expected(self, child, date_str, filenames):
+        """Photo names the site shows for a date, in viewer order"""
+        self.prepare(child)
+        with self.lock:
+            self.date_entry(child, date_str)['expected'] = list(filenames)
+            self.dirty.add((child, date_str[:4]))
+        self.save()
+
+    def save(self, force=False):
+        """Write changed shards atomically, at most every `interval` seconds unless forced"""
+        with self.lock:
+            if self.read_only or not self.dirty or (not force and time.time() - self.saved_at < self.interval):
+                return
+            for child, year in self.dirty:
+                path = self.shard_path(child, year)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = path + '.tmp'
+                with open(tmp_path, 'w') as f:
+                    json.dump(self.shards[(child, year)], f, sort_keys=True)
+                os.replace(tmp_path, path)
+            self.dirty.clear()
+            self.saved_at = time.time()
+
+    def rebuild(self, child):
+        """One-time scan of an archive that predates the index"""
+        child_dir = os.path.join(self.root, child)
+        with self.lock:
+            for date_entry in os.scandir(child_dir):
+                if not date_entry.is_dir() or date_entry.name.startswith('.') or len(date_entry.name) != 10:
+                    continue
+                for photo in os.scandir(date_entry.path):
+                    if photo.is_file() and not photo.name.startswith('.'):
+                        self.date_entry(child, date_entry.name)['photos'][photo.name] = {
+                            'size': photo.stat().st_size, 'sha256': None
+                        }
+                self.dirty.add((child, date_entry.name[:4]))
+        self.save(force=True)
+
+    @staticmethod
+    def is_complete(entry):
+        return entry['expected'] is not None and all(name in entry['photos'] for name in entry['expected'])
+
+    def latest_synced_date(self, child):
+        """Newest date whose expected photos are all on disk, or None"""
+        for year in self.years(child):
+            dates = self.shard(child, year)
+            for date_str in sorted(dates, reverse=True):
+                if self.is_complete(dates[date_str]):
+                    return date_str
+        return None
+
+    def count_per_month(self, child):
+        """{'YYYY-MM': photos on disk}"""
+        counts = {}
+        for year in self.years(child):
+            for date_str, entry in self.shard(child, year).items():
+                month = date_str[:7]
+                counts[month] = counts.get(month, 0) + len(entry['photos'])
+        return dict(sorted(counts.items()))
+
+    def photo_count(self, child, date_str):
+        """Photos of one date on disk"""
+        self.prepare(child)
+        entry = self.shard(child, date_str[:4]).get(date_str)
+        return len(entry['photos']) if entry else 0
+
+    def missing_indices(self, child, date_str):
+        """1-based viewer positions of a date's photos that aren't on disk (None if unknown)"""
+        entry = self.shard(child, date_str[:4]).get(date_str)
+        if not entry or entry['expected'] is None:
+            return None
+        return [i for i, name in enumerate(entry['expected'], 1) if name not in entry['photos']]
+
+    def incomplete_dates(self, child):
+        """Dates with known photos missing, newest first"""
+        result = []
+        for year in self.years(child):
+            dates = self.shard(child, year)
+            for date_str in sorted(dates, reverse=True):
+                if dates[date_str]['expected'] is not None and not self.is_complete(dates[date_str]):
+                    result.append(date_str)
+        return result
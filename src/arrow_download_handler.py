@@ -1,96 +1,253 @@
 import os
 import time
-import shutil
+import hashlib
 from pathlib import Path
-from datetime import datetime
+from urllib.parse import urlparse, unquote
+from datetime import datetime, timedelta
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
+from http_downloader import HttpDownloader, is_media_file
+from download_pipeline import DownloadJob
+from manifest import DownloadManifest
+from download_watcher import DownloadWatcher
+from dom_extract import EXTRACT_CARDS_JS, EXPAND_CARDS_JS, PRUNE_CARDS_JS, FORWARD_ARROW_SELECTORS, FORWARD_ARROW_PATH, FORWARD_ARROW_FALLBACK, VIEWER_IMAGE_SELECTORS, CLOSE_BUTTON_SELECTORS
+from locator_cache import LocatorCache, VISIBLE
+from checkpoint import Checkpoint
+from archive_index import ArchiveIndex
+from postprocess import PostProcessor
+from date_parsing import parse_estonian_date
+from thumbnail_urls import full_size_url
+from network_capture import NetworkCapture
+from photo_store import PhotoStore, link_file, move_into_place, file_sha256, legacy_photos, find_legacy_duplicate
+from firefox_session import images_blocked
+from waits import Waiter, count_increased, image_src_changed, viewer_open, viewer_closed
+
+CARD_LOCATOR = (By.CSS_SELECTOR, "div.card.p-3.mb-3")
+THUMBNAIL_LOCATOR = (By.CSS_SELECTOR, "div.e3-image-thumbnail")
 
 class ArrowDownloadHandler:
-    def __init__(self, driver, config):
-        """Initialize download handler with browser driver and config"""
+    def __init__(self, driver, config, waiter=None, download_dir=None, read_only=False):
+        """Initialize download handler with browser driver and config
+
+        read_only (--plan) only reads the diary and the archive: no downloaders,
+        post-processing or writes to the manifest and index.
+        """
         self.driver = driver
         self.config = config
         self.wait = WebDriverWait(driver, 10)
+        self.waiter = waiter or Waiter(driver, config)
+        self.metrics = self.waiter.metrics
+        self.rate = self.waiter.rate
+        self.locators = LocatorCache(driver)
+        self.download_wait_timeout = config.get('download_wait_timeout', 10)
         self.download_path = config.get('download_path', 'downloads')
-        self.firefox_download_dir = str(Path.home() / "Downloads")
+        # Dedicated per-run directory the browser saves into (see get_firefox_driver)
+        self.firefox_download_dir = download_dir or str(Path.home() / "Downloads")
+        self.download_mode = config.get('download_mode', 'http')
+        # 'viewer' steps through the photo viewer, 'grid' reads URLs off the thumbnails,
+        # 'network' takes them from the diary JSON the page fetches
+        self.discovery_mode = config.get('discovery_mode', 'viewer')
+        self.capture = None
+        self.thumbnail_rewrites = config.get('thumbnail_url_rewrites')
+        self.grid_mode = self.discovery_mode == 'grid' and self.download_mode == 'http'
+        self.images_blocked = images_blocked(config)
+        self.http_downloader = None
+        if self.download_mode == 'http' and not read_only:
+            if config.get('download_engine', 'threads') == 'asyncio':
+                from async_downloader import AsyncDownloader
+                self.http_downloader = AsyncDownloader(driver, config, rate=self.rate)
+            else:
+                self.http_downloader = HttpDownloader(driver, config, rate=self.rate)
+        self.photo_store = None
+        self.download_watcher = None
+        if self.download_mode == 'browser' and not read_only:
+            self.download_watcher = DownloadWatcher(self.firefox_download_dir)
+        # Optional DownloadPipeline; when set, URLs are queued instead of downloaded inline
+        self.pipeline = None
+        self.skip_existing = config.get('skip_existing', True)
+        self.manifest = DownloadManifest(
+            config.get('manifest_path', os.path.join(self.download_path, '.manifest.sqlite')), read_only=read_only
+        )
+        # Per-child, per-year index of what's on disk (download_path/<child>/.index/YYYY.json)
+        self.archive = ArchiveIndex(self.download_path, interval=config.get('checkpoint_interval', 30),
+                                    read_only=read_only)
+        # Date folders already created this run, so each is made once
+        self.created_dirs = set()
+        # Optional thumbnails / EXIF dates / re-compression in worker processes
+        self.postprocessor = PostProcessor(config, metrics=self.metrics, on_rewritten=self.photo_rewritten)
+        if not self.postprocessor.enabled or read_only:
+            self.postprocessor = None
+        if self.http_downloader:
+            self.photo_store = PhotoStore(self.http_downloader, self.manifest, metrics=self.metrics,
+                                          archive=self.archive, postprocessor=self.postprocessor)
+        self.child_id = None
+        self.resume = config.get('resume', False)
+        # Optional date range (YYYY-MM-DD); cards load newest first
+        self.since = config.get('since')
+        self.until = config.get('until')
+        self.since_last_sync = config.get('since_last_sync', False)
+        # Card date texts that didn't parse; reported, never guessed
+        self.unparsed_dates = set()
+        # Cards are only appended by 'load older', so each page read starts at the cursor
+        self.card_cursor = 0
+        self.pruned_until = 0
+        self.cards_per_date = {}
+        # Photo names of the cards handled so far per date; a date can have several cards
+        self.date_photos = {}
+        # Walks whose checkpoint is closed once their queued downloads are in (see complete_walks)
+        self.pending_walks = []
+        # Photos that failed without the pipeline; their cards stay unfinished
+        self.failed_photos = 0
+        # Empty processed cards in the page so memory stays flat on long diaries
+        self.prune_cards = config.get('prune_processed_cards', False)
+        self.checkpoint_dir = os.path.join(self.download_path, '.checkpoints')
         
     def ensure_directory(self, path):
-        """Create directory if it doesn't exist"""
-        os.makedirs(path, exist_ok=True)
+        """Create directory if it doesn't exist (once per run)"""
+        if path not in self.created_dirs:
+            os.makedirs(path, exist_ok=True)
+            self.created_dirs.add(path)
         return path
     
+    def parse_card_date(self, date_text):
+        """Parse a diary card date like 'reede, 30 mai 2025', None if it can't be read"""
+        return parse_estonian_date(date_text)
+    
     def extract_date_from_card(self, card_element):
         """Extract date from diary card"""
         try:
             date_elem = card_element.find_element(By.CSS_SELECTOR, ".text-muted")
-            date_text = date_elem.text
-            
-            months = {
-                'jaanuar': 1, 'veebruar': 2, 'märts': 3, 'aprill': 4,
-                'mai': 5, 'juuni': 6, 'juuli': 7, 'august': 8,
-                'september': 9, 'oktoober': 10, 'november': 11, 'detsember': 12
-            }
-            
-            parts = date_text.split(', ')[1].split(' ')
-            day = int(parts[0])
-            month_name = parts[1].lower()
-            year = int(parts[2])
-            
-            month = months.get(month_name, 1)
-            return datetime(year, month, day)
-            
+            return self.parse_card_date(date_elem.text)
         except Exception as e:
-            print(f"  Error parsing date: {e}")
-            return datetime.now()
+            print(f"  Error reading card date: {e}")
+            return None
+    
+    def report_unparsed_date(self, date_text):
+        """Warn once per unreadable date text instead of guessing a folder"""
+        if date_text not in self.unparsed_dates:
+            self.unparsed_dates.add(date_text)
+            print(f"  ⚠ Could not read date {date_text!r}, skipping this entry")
+    
+    def expand_cards(self):
+        """Click every 'Kuva rohkem' so all thumbnails are on the page"""
+        before = len(self.driver.find_elements(*THUMBNAIL_LOCATOR))
+        if self.driver.execute_script(EXPAND_CARDS_JS):
+            self.waiter.until('show_more_photos', count_increased(THUMBNAIL_LOCATOR, before))
     
+    def grid_urls(self, card):
+        """Full-size URLs for all thumbnails of a card, or None if any can't be derived"""
+        urls = []
+        for full_url, thumbnail_url in zip(card['full_urls'], card['thumbnail_urls']):
+            url = full_url or full_size_url(thumbnail_url, self.thumbnail_rewrites)
+            if not url:
+                return None
+            urls.append(url)
+        return urls if urls and len(urls) == card['thumbnail_count'] else None
     
-    def get_photo_path(self, child_name, date, index):
-        """Build path: base/child_name/YYYY-MM-DD/photo_index.jpg"""
+    def extract_cards(self, start=0):
+        """Read diary cards from index start on (date text, thumbnails, URLs) in one round-trip"""
+        return self.driver.execute_script(EXTRACT_CARDS_JS, start) or []
+    
+    def card_key(self, entry_id, date):
+        """Stable key of a diary entry: its id, or 'YYYY-MM-DD#n' for the n-th entry of that date"""
+        date_str = date.strftime('%Y-%m-%d')
+        self.cards_per_date[date_str] = self.cards_per_date.get(date_str, 0) + 1
+        if entry_id:
+            return str(entry_id)
+        return f"{date_str}#{self.cards_per_date[date_str]}"
+    
+    def prune_processed_cards(self):
+        """Empty the cards before the cursor (when prune_processed_cards is on)"""
+        if not self.prune_cards or self.pruned_until >= self.card_cursor:
+            return
+        try:
+            self.driver.execute_script(PRUNE_CARDS_JS, self.pruned_until, self.card_cursor)
+            self.pruned_until = self.card_cursor
+        except Exception as e:
+            print(f"  Could not empty processed cards: {e}")
+    
+    def get_photo_path(self, child_name, date, index, url=None):
+        """Build path: base/child_name/YYYY-MM-DD/photo_YYYYMMDD_<key>.jpg
+        
+        With the image URL the name comes from its cloudfront object key, so it
+        stays the same when photos are added or removed on that date; without
+        it the viewer position is used.
+        """
         date_folder = date.strftime("%Y-%m-%d")
         full_path = os.path.join(self.download_path, child_name, date_folder)
         self.ensure_directory(full_path)
         
-        filename = f"photo_{date.strftime('%Y%m%d')}_{index:03d}.jpg"
+        if url:
+            object_key = DownloadManifest.url_key(url)
+            ext = os.path.splitext(urlparse(url).path)[1].lower() or '.jpg'
+            key = hashlib.sha1(object_key.encode()).hexdigest()[:12]
+            filename = f"photo_{date.strftime('%Y%m%d')}_{key}{ext}"
+        else:
+            filename = f"photo_{date.strftime('%Y%m%d')}_{index:03d}.jpg"
         return os.path.join(full_path, filename)
     
-    def wait_for_download(self, timeout=10):
-        """Wait for download to complete"""
-        start_time = time.time()
+    def legacy_names_match(self, child_name, date, first_index, count):
+        """Whether index-named photos from older versions still line up with viewer positions
         
-        while time.time() - start_time < timeout:
-            download_files = list(Path(self.firefox_download_dir).glob("*.jpg"))
-            temp_files = list(Path(self.firefox_download_dir).glob("*.part"))
-            
-            if download_files and not temp_files:
-                return download_files[0] if download_files else None
-            
-            time.sleep(0.5)
-        
-        return None
+        Older versions saved photo_YYYYMMDD_NNN.jpg by position. While the date
+        shows as many photos as there are such files, position N is photo N.
+        """
+        if first_index != 1:
+            return False
+        folder = os.path.dirname(self.get_photo_path(child_name, date, 1))
+        return len(legacy_photos(folder)) == count
     
-    def clear_downloads(self):
-        """Clear existing downloads"""
-        for f in Path(self.firefox_download_dir).glob("*.jpg"):
-            try:
-                f.unlink()
-            except:
-                pass
+    def adopt_legacy_photo(self, child_name, date, index, url):
+        """Rename an index-named photo to its object key name instead of downloading it again"""
+        legacy_path = self.get_photo_path(child_name, date, index)
+        dest_path = self.get_photo_path(child_name, date, index, url)
+        if not url or not os.path.exists(legacy_path) or os.path.exists(dest_path):
+            return False
+        move_into_place(legacy_path, dest_path)
+        self.archive.remove_photo(legacy_path)
+        return True
+    
+    def wait_for_download(self, known_files, timeout=10, expected_name=None):
+        """Wait for the browser to finish writing a new file, returns its path"""
+        started = time.time()
+        path = self.download_watcher.wait_for_file(known_files, timeout, expected_name)
+        self.waiter.record('file_wait', time.time() - started, timed_out=path is None)
+        return path
+    
+    def fetch_current_photo(self, known_files, expected_name=None):
+        """Click download and wait for the file, retrying with backoff; returns its path or None"""
+        for attempt in range(self.rate.max_retries + 1):
+            if attempt:
+                delay = self.rate.retry_delay(attempt - 1)
+                print(f" retry in {delay:.1f}s...", end='', flush=True)
+                time.sleep(delay)
+            self.rate.wait_if_paused()
+            if not self.download_current_photo():
+                continue
+            started = time.time()
+            path = self.wait_for_download(known_files, timeout=self.rate.wait_timeout(self.download_wait_timeout),
+                                          expected_name=expected_name)
+            if path:
+                self.rate.report_success(time.time() - started)
+                return path
+            self.rate.report_failure()
+        return None
     
     def download_current_photo(self):
         """Download the currently displayed photo"""
-        try:
-            # Find and click download button
-            download_btn = self.wait.until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, ".mdi-download"))
-            )
-            self.driver.execute_script("arguments[0].click();", download_btn)
-            return True
-        except:
-            return False
-    
+        with self.metrics.span('download_click'):
+            try:
+                # Find and click download button
+                download_btn = self.wait.until(
+                    EC.element_to_be_clickable((By.CSS_SELECTOR, ".mdi-download"))
+                )
+                self.driver.execute_script("arguments[0].click();", download_btn)
+                return True
+            except:
+                return False
+        
     def has_forward_arrow(self):
         """Check if forward arrow exists and is clickable"""
         try:
@@ -103,174 +260,261 @@ class ArrowDownloadHandler:
                     if classes and ('arrow' in classes or 'chevron' in classes or 'next' in classes):
                         print(f"    - {btn.tag_name}: {classes}")
             
-            # Look for forward/next arrow - common selectors
-            forward_selectors = [
-                # SVG arrow button (based on your inspection)
-                "button.d-none:nth-child(1)",
-                "button:has(svg path[d*='M8.59,16.58L13.17,12'])",
-                "button svg[viewBox='0 0 24 24']",
-                # Icon-based arrows
-                ".mdi-chevron-right",
-                ".mdi-arrow-right",
-                # Other common patterns
-                "[aria-label*='next']",
-                "[aria-label*='Next']",
-                "button[title*='next']"
-            ]
-            
-            for selector in forward_selectors:
-                try:
-                    if selector == "button.d-none:nth-child(1)":
-                        # Special handling for d-none button - find by SVG content
-                        buttons = self.driver.find_elements(By.TAG_NAME, "button")
-                        for btn in buttons:
-                            try:
-                                svg = btn.find_element(By.TAG_NAME, "svg")
-                                path = svg.find_element(By.TAG_NAME, "path")
-                                d_attr = path.get_attribute("d")
-                                if d_attr and "M8.59,16.58L13.17,12" in d_attr:
-                                    # This is the forward arrow
-                                    if self.config.get('debug_mode'):
-                                        print(f"  Found forward arrow button via SVG path")
-                                    return btn
-                            except:
-                                continue
-                    else:
-                        arrows = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                        for arrow in arrows:
-                            if arrow.is_displayed() and arrow.size['width'] > 0:
-                                if self.config.get('debug_mode'):
-                                    print(f"  Found arrow with selector: {selector}")
-                                return arrow
-                except:
-                    continue
-            
-            return None
+            # Cached arrow (or the selector that found it last time), one round-trip. The SVG
+            # path button counts even when hidden: the site also renders a button.d-none arrow
+            return self.locators.read('forward_arrow', FORWARD_ARROW_SELECTORS,
+                                      f'el.matches("{FORWARD_ARROW_PATH}") || ({VISIBLE})',
+                                      value="el.closest('button') || el", unlearned=(FORWARD_ARROW_FALLBACK,))
         except:
             return None
     
     def click_forward_arrow(self):
         """Click the forward arrow to go to next photo"""
-        arrow = self.has_forward_arrow()
-        if arrow:
-            try:
-                # Get current image src before clicking
-                current_img = self.get_current_image_src()
-                
-                # Click arrow
-                self.driver.execute_script("arguments[0].click();", arrow)
-                
-                # Wait for image to change
-                start_time = time.time()
-                while time.time() - start_time < 5:  # 5 second timeout
-                    time.sleep(0.3)
-                    new_img = self.get_current_image_src()
-                    if new_img and new_img != current_img:
-                        # Image has changed
+        with self.metrics.span('arrow_step'):
+            arrow = self.has_forward_arrow()
+            if arrow:
+                try:
+                    # Get current image src before clicking
+                    current_img = self.get_current_image_src()
+                    
+                    # Click arrow
+                    self.driver.execute_script("arguments[0].click();", arrow)
+                    
+                    # Wait for image to change
+                    if self.waiter.until('arrow_step', image_src_changed(self.get_current_image_src, current_img), timeout=5):
                         return True
-                
-                print("  Warning: Image didn't change after arrow click")
-                return False
-            except:
-                pass
-        return False
-    
+                    
+                    print("  Warning: Image didn't change after arrow click")
+                    return False
+                except:
+                    pass
+            return False
+        
     def get_current_image_src(self):
         """Get the src of the currently displayed image"""
+        # Main image, not a thumbnail: rendered and taller than 100px. Blocked images
+        # have no size, so then the viewer's own class stands in for the height
+        size = "el.getBoundingClientRect().height > 100"
+        if self.images_blocked:
+            size = f"el.matches('img.e3-img-full') || {size}"
+        condition = f"({VISIBLE}) && ({size})"
         try:
-            # Look for the main displayed image in the viewer
-            selectors = [
-                "img.e3-img-full",
-                ".modal img",
-                ".photo-viewer img",
-                "img[style*='display: block']",
-                "img:not(.e3-image-thumbnail)"
-            ]
-            
-            for selector in selectors:
-                imgs = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                for img in imgs:
-                    if img.is_displayed() and img.size['height'] > 100:  # Main image, not thumbnail
-                        src = img.get_attribute('src')
-                        if src and 'cloudfront' in src:
-                            return src
-            
-            return None
+            return self.locators.read(
+                'viewer_image', VIEWER_IMAGE_SELECTORS,
+                f"({condition}) && (el.getAttribute('src') || '').includes('cloudfront')",
+                value="el.getAttribute('src')"
+            )
         except:
             return None
     
     def close_photo_viewer(self):
         """Close the photo viewer"""
         try:
-            # Try multiple ways to close
-            close_selectors = [
-                ".mdi-close",
-                "[aria-label='close']",
-                "button.close",
-                ".modal-close"
-            ]
-            
-            for selector in close_selectors:
-                try:
-                    close_btn = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    if close_btn.is_displayed():
-                        self.driver.execute_script("arguments[0].click();", close_btn)
-                        time.sleep(0.5)
-                        return
-                except:
-                    continue
-            
-            # If no close button found, try ESC
-            self.driver.find_element(By.TAG_NAME, "body").send_keys(Keys.ESCAPE)
-            time.sleep(0.5)
-            
+            close_btn = self.locators.read('close_button', CLOSE_BUTTON_SELECTORS)
+            if close_btn:
+                self.driver.execute_script("arguments[0].click();", close_btn)
+            else:
+                # If no close button found, try ESC
+                self.driver.find_element(By.TAG_NAME, "body").send_keys(Keys.ESCAPE)
+            self.waiter.until('viewer_close', viewer_closed(self.get_current_image_src), timeout=3)
         except:
             pass
     
-    def download_photos_for_date(self, card_element, child_name, date):
-        """Download all photos for a specific date using arrow navigation"""
-        downloaded = 0
+    def open_photo_viewer(self, thumbnails):
+        """Open the viewer on the first thumbnail of a card"""
+        with self.metrics.span('viewer_open'):
+            # Click first thumbnail
+            self.driver.execute_script("arguments[0].scrollIntoView(true);", thumbnails[0])
+            self.driver.execute_script("arguments[0].click();", thumbnails[0])
+            self.waiter.until('viewer_open', viewer_open(self.get_current_image_src))
         
+    def collect_image_urls(self):
+        """Step through the open viewer and collect full-size image URLs"""
+        urls = []
+        while True:
+            src = self.get_current_image_src()
+            if src in urls:
+                # Viewer wrapped around to a photo we already have
+                break
+            if src:
+                urls.append(src)
+            
+            # Try to go to next photo
+            if not self.click_forward_arrow():
+                # No more photos for this date
+                break
+        
+        return urls
+    
+    def record_file(self, date_str, url, path):
+        """Record a file already on disk in the manifest"""
+        sha256 = file_sha256(path)
+        size = os.path.getsize(path)
+        duplicate = (self.manifest.find_path_by_hash(sha256, exclude_path=path) or
+                     find_legacy_duplicate(path, size, sha256))
+        if duplicate:
+            link_file(duplicate, path)
+        self.manifest.record_photo(self.child_id, date_str, url, path, size, sha256)
+        self.archive.add_photo(path, size, sha256)
+    
+    def photo_rewritten(self, path, info):
+        """Post-processing changed a photo's bytes; keep its manifest and index hash in step"""
+        self.manifest.update_file(path, info['size'], info['sha256'])
+        self.archive.add_photo(path, info['size'], info['sha256'])
+    
+    def is_known_photo(self, date, url):
+        """Check the manifest for a photo we already have"""
+        return bool(self.skip_existing and url and
+                    self.manifest.has_photo(self.child_id, date.strftime('%Y-%m-%d'), url))
+    
+    def download_photos_for_date(self, card_element, child_name, date, thumbnails=None, urls=None, card_key=None):
+        """Download all photos for a specific date"""
         # Find thumbnails in this card - no expansion needed
-        try:
+        if thumbnails is None and urls is None:
             thumbnails = card_element.find_elements(By.CSS_SELECTOR, ".e3-image-thumbnail")
-            if not thumbnails:
-                # No visible thumbnails, skip this date
+        count = len(urls) if urls is not None else len(thumbnails)
+        if not count:
+            # No visible thumbnails, skip this date
+            return 0
+        
+        date_str = date.strftime('%Y-%m-%d')
+        # Earlier cards of the same date count towards the date's photos
+        earlier = self.date_photos.setdefault(date_str, [])
+        # Unexpanded cards hide photos behind 'Kuva rohkem', so only a full count can say nothing is new
+        exact = urls is not None or self.grid_mode
+        if (self.skip_existing and exact and
+                self.manifest.is_date_synced(self.child_id, date_str, len(earlier) + count)):
+            print(f"  All {count} photos for {date_str} already downloaded")
+            earlier.extend([None] * count)
+            return 0
+        
+        print(f"  Found {count} {'photos' if urls is not None else 'visible photos'} for {date_str}")
+        
+        if self.download_mode == 'http':
+            return self.download_photos_via_http(thumbnails, child_name, date, urls, card_key)
+        return self.download_photos_via_browser(thumbnails, child_name, date)
+    
+    def record_date_photos(self, child_name, date_str, names):
+        """Record a card's photo names (viewer order) in the manifest and archive index"""
+        earlier = self.date_photos.setdefault(date_str, [])
+        earlier.extend(names)
+        self.manifest.record_date(self.child_id, date_str, len(earlier))
+        self.archive.set_expected(child_name, date_str, [name for name in earlier if name])
+    
+    def download_photos_via_http(self, thumbnails, child_name, date, urls=None, card_key=None):
+        """Collect image URLs in the viewer (unless already known from the grid), then fetch them concurrently over HTTP"""
+        downloaded = 0
+        
+        if urls is None:
+            try:
+                self.open_photo_viewer(thumbnails)
+                urls = self.collect_image_urls()
+                self.close_photo_viewer()
+            except Exception as e:
+                print(f"  Error collecting photo URLs: {e}")
+                self.close_photo_viewer()
+                self.failed_photos += 1
                 return downloaded
+        
+        # Viewer positions continue after earlier cards of the same date
+        first_index = len(self.date_photos.get(date.strftime('%Y-%m-%d'), [])) + 1
+        if urls and self.legacy_names_match(child_name, date, first_index, len(urls)):
+            # Found and recorded as existing files below
+            adopted = sum(self.adopt_legacy_photo(child_name, date, i, url) for i, url in enumerate(urls, first_index))
+            if adopted:
+                print(f"  Renamed {adopted} photos from an older version")
+        if urls:
+            self.record_date_photos(child_name, date.strftime('%Y-%m-%d'), [
+                os.path.basename(self.get_photo_path(child_name, date, i, url))
+                for i, url in enumerate(urls, first_index)
+            ])
+        
+        if self.pipeline:
+            # Workers download while the browser moves on to the next date
+            queued = 0
+            for photo_index, url in enumerate(urls, first_index):
+                if self.is_known_photo(date, url):
+                    continue
+                job = DownloadJob(child_name, date, photo_index, url, self.child_id, card=card_key)
+                if self.pipeline.submit(job):
+                    queued += 1
+            print(f"  Queued {queued} photos")
+            return queued
+        
+        jobs = []
+        for photo_index, url in enumerate(urls, first_index):
+            if self.is_known_photo(date, url):
+                print(f"    Photo {photo_index}... (exists)")
+            else:
+                jobs.append((photo_index, url, self.get_photo_path(child_name, date, photo_index, url)))
+        
+        date_str = date.strftime('%Y-%m-%d')
+        results = self.photo_store.store_many(
+            [(self.child_id, date_str, url, dest) for _, url, dest in jobs]
+        )
+        for (photo_index, _, _), (status, result) in zip(jobs, results):
+            if status == 'downloaded':
+                downloaded += 1
+                print(f"    Photo {photo_index}... ✓")
+            elif status == 'failed':
+                self.failed_photos += 1
+                print(f"    Photo {photo_index}... (failed: {result})")
+            else:
+                print(f"    Photo {photo_index}... ({status})")
+        
+        return downloaded
+    
+    def download_photos_via_browser(self, thumbnails, child_name, date):
+        """Download all photos for a specific date using arrow navigation"""
+        downloaded = 0
+        date_str = date.strftime('%Y-%m-%d')
+        
+        try:
+            self.open_photo_viewer(thumbnails)
             
-            print(f"  Found {len(thumbnails)} visible photos for {date.strftime('%Y-%m-%d')}")
-            
-            # Click first thumbnail
-            self.driver.execute_script("arguments[0].scrollIntoView(true);", thumbnails[0])
-            time.sleep(0.5)
-            self.driver.execute_script("arguments[0].click();", thumbnails[0])
-            time.sleep(1)
-            
-            # Download photos using arrow navigation
-            photo_index = 1
+            # Download photos using arrow navigation, numbered after earlier cards of this date
+            photo_index = len(self.date_photos.get(date_str, [])) + 1
+            legacy = self.legacy_names_match(child_name, date, photo_index, len(thumbnails))
+            expected = []
             while True:
                 print(f"    Photo {photo_index}...", end='', flush=True)
+                current_src = self.get_current_image_src()
+                expected.append(os.path.basename(self.get_photo_path(child_name, date, photo_index, current_src)))
                 
-                # Clear downloads folder
-                self.clear_downloads()
-                
-                # Download current photo
-                if self.download_current_photo():
-                    # Wait for download
-                    downloaded_file = self.wait_for_download()
-                    if downloaded_file:
-                        # Move to organized location
-                        dest_path = self.get_photo_path(child_name, date, photo_index)
+                if self.is_known_photo(date, current_src):
+                    # Already in the manifest, no need to click download
+                    print(" (exists)")
+                elif legacy and self.adopt_legacy_photo(child_name, date, photo_index, current_src):
+                    self.record_file(date_str, current_src, self.get_photo_path(child_name, date, photo_index, current_src))
+                    print(" (renamed from an older version)")
+                else:
+                    known_files = self.download_watcher.snapshot()
+                    expected_name = unquote(os.path.basename(urlparse(current_src).path)) if current_src else None
+                    
+                    # Download current photo, retrying slow or failed clicks
+                    downloaded_file = self.fetch_current_photo(known_files, expected_name)
+                    if downloaded_file and not is_media_file(downloaded_file):
+                        os.remove(downloaded_file)
+                        self.failed_photos += 1
+                        print(" (not an image)")
+                    elif downloaded_file:
+                        # Rename into the organized location (same filesystem, no copy)
+                        dest_path = self.get_photo_path(child_name, date, photo_index, current_src)
                         if not os.path.exists(dest_path):
-                            shutil.move(str(downloaded_file), dest_path)
+                            with self.metrics.span('move'):
+                                move_into_place(str(downloaded_file), dest_path)
                             downloaded += 1
                             print(" ✓")
                         else:
+                            os.remove(downloaded_file)
                             print(" (exists)")
+                        if current_src:
+                            self.record_file(date_str, current_src, dest_path)
+                        if self.postprocessor:
+                            self.postprocessor.submit(dest_path, date_str)
                     else:
-                        print(" (timeout)")
-                else:
-                    print(" (failed)")
+                        self.failed_photos += 1
+                        print(" (failed)")
                 
                 # Try to go to next photo
                 if not self.click_forward_arrow():
@@ -278,75 +522,287 @@ class ArrowDownloadHandler:
                     break
                 
                 photo_index += 1
-                time.sleep(0.5)
             
             # Close photo viewer
             self.close_photo_viewer()
+            self.record_date_photos(child_name, date_str, expected)
             
         except Exception as e:
             print(f"  Error processing date photos: {e}")
             self.close_photo_viewer()
+            self.failed_photos += 1
         
         return downloaded
     
     def load_more_dates(self):
         """Click 'Vaata vanemaid päevikuid' to load older dates"""
+        with self.metrics.span('pagination'):
+            try:
+                # Look for the button
+                buttons = self.driver.find_elements(By.CSS_SELECTOR, "button.position-relative")
+                for btn in buttons:
+                    if "Vaata vanemaid" in btn.text:
+                        before = len(self.driver.find_elements(*CARD_LOCATOR))
+                        print("\n→ Loading older diary entries...")
+                        
+                        def click():
+                            self.driver.execute_script("arguments[0].scrollIntoView(true);", btn)
+                            self.driver.execute_script("arguments[0].click();", btn)
+                            return self.waiter.until('load_more_dates', count_increased(CARD_LOCATOR, before))
+                        
+                        # A click that loads nothing is retried with backoff
+                        self.rate.call(click, "loading older entries")
+                        return True
+                return False
+            except:
+                return False
+        
+    def fast_forward(self, depth):
+        """Click 'load older' depth times without processing cards in between"""
+        print(f"Resuming: loading {depth} pages of older entries...")
+        for i in range(depth):
+            if not self.load_more_dates():
+                return i
+        return depth
+    
+    def start_capture(self):
+        """Record the diary API responses of the current page (network discovery mode)"""
+        if self.discovery_mode != 'network' or self.download_mode != 'http':
+            return None
+        capture = NetworkCapture(self.driver, self.config)
         try:
-            # Look for the button
-            buttons = self.driver.find_elements(By.CSS_SELECTOR, "button.position-relative")
-            for btn in buttons:
-                if "Vaata vanemaid" in btn.text:
-                    self.driver.execute_script("arguments[0].scrollIntoView(true);", btn)
-                    time.sleep(0.5)
-                    self.driver.execute_script("arguments[0].click();", btn)
-                    print("\n→ Loading older diary entries...")
-                    time.sleep(3)
-                    return True
-            return False
-        except:
-            return False
+            capture.install()
+            return capture
+        except Exception as e:
+            print(f"Could not record network responses ({e}), reading the cards instead")
+            return None
+    
+    def read_entries(self):
+        """Diary entries not read yet as (entry, date) pairs; entries from the network come with URLs"""
+        if self.capture:
+            entries = self.capture.drain()
+            if entries or self.capture.responses:
+                return [({'element': None, 'thumbnails': None, 'urls': e['urls'],
+                          'key': self.card_key(e['id'], e['date'])}, e['date']) for e in entries]
+            print("  No diary data captured from the network, reading the cards instead")
+            self.capture = None
+        
+        if self.grid_mode:
+            self.expand_cards()
+        result = []
+        for card in self.extract_cards(self.card_cursor):
+            self.card_cursor = card['index'] + 1
+            date = self.parse_card_date(card['date_text'])
+            if date is None:
+                self.report_unparsed_date(card['date_text'])
+                continue
+            result.append((dict(card, urls=None, key=self.card_key(card['entry_id'], date)), date))
+        return result
+    
+    def date_cutoff(self):
+        """Oldest date to process for the current child, or None for the whole diary"""
+        cutoff = self.since
+        if self.since_last_sync:
+            last_sync = self.manifest.last_sync(self.child_id)
+            if last_sync:
+                # Entries can be posted or edited a little after their date
+                overlap = timedelta(days=self.config.get('sync_overlap_days', 1))
+                since_sync = (last_sync - overlap).strftime('%Y-%m-%d')
+                cutoff = max(cutoff, since_sync) if cutoff else since_sync
+            else:
+                print("No earlier sync recorded, checking the whole diary")
+        return cutoff
+    
+    def synced_cutoff(self):
+        """Oldest date still worth checking above the fully synced frontier, or None
+
+        The frontier date itself and the sync_overlap_days before it are checked
+        again: a second entry or a late post can still land on them.
+        """
+        synced_until = self.manifest.newest_synced_date(self.child_id) if self.skip_existing else None
+        if not synced_until:
+            return None
+        overlap = timedelta(days=self.config.get('sync_overlap_days', 1))
+        return (datetime.strptime(synced_until, '%Y-%m-%d') - overlap).strftime('%Y-%m-%d')
+    
+    def card_finished(self, walk, key, ok, date_str):
+        """All queued photos of a card are done (called from download workers)"""
+        if ok:
+            walk['checkpoint'].mark_card(key)
+        else:
+            self.card_failed(walk, key, date_str)
+    
+    def card_failed(self, walk, key, date_str):
+        """Keep a card for --resume; complete_walk holds the synced frontier below its date"""
+        walk['failed_cards'].add(key)
+        walk['failed_dates'].add(date_str)
+    
+    def complete_walk(self, walk, drained=True):
+        """Close a child's walk once its downloads are done
+        
+        With failed cards the checkpoint stays resumable so --resume retries them,
+        and the sync time is only recorded when every photo made it.
+        """
+        # After the walk, so no later card of the same date records its count over this
+        for date_str in walk['failed_dates']:
+            self.manifest.mark_date_incomplete(walk['child_id'], date_str)
+        if not walk['stopped_early']:
+            self.manifest.mark_walk_completed(walk['child_id'])
+        if walk['failed_cards'] or not drained:
+            missing = len(walk['failed_cards']) or 'Some'
+            print(f"{missing} diary entries of {walk['child_id']} have photos missing, --resume will retry them")
+            walk['checkpoint'].save(force=True)
+            return
+        walk['checkpoint'].mark_completed()
+        if not self.until:
+            # Everything newer than the cutoff is now on disk
+            self.manifest.record_sync(walk['child_id'], walk['started_at'])
+    
+    def complete_walks(self):
+        """Close the walks whose downloads the pipeline has now finished"""
+        # Cards still open here had jobs dropped instead of downloaded
+        drained = not self.pipeline.cards
+        for walk in self.pending_walks:
+            self.complete_walk(walk, drained)
+        self.pending_walks = []
+    
+    def save_pending_walks(self):
+        """Keep the cards finished so far when stopping before the downloads are in"""
+        for walk in self.pending_walks:
+            for date_str in walk['failed_dates']:
+                self.manifest.mark_date_incomplete(walk['child_id'], date_str)
+            walk['checkpoint'].save(force=True)
     
-    def process_all_dates(self, child_name):
+    def process_all_dates(self, child_name, child_id=None):
         """Process all date cards and download photos"""
         total_downloaded = 0
-        processed_dates = set()
+        started_at = datetime.now()
+        self.child_id = child_id or child_name
+        self.metrics.set_context(self.child_id)
+        self.card_cursor = 0
+        self.pruned_until = 0
+        self.cards_per_date = {}
+        self.date_photos = {}
+        if self.http_downloader:
+            self.http_downloader.sync_cookies()
         
-        while True:
-            # Find all diary cards
-            cards = self.driver.find_elements(By.CSS_SELECTOR, "div.card.p-3.mb-3")
-            
-            # Process new cards only
-            new_cards = []
-            for card in cards:
-                try:
-                    date = self.extract_date_from_card(card)
-                    date_str = date.strftime('%Y-%m-%d')
-                    if date_str not in processed_dates:
-                        new_cards.append((card, date, date_str))
-                except:
-                    continue
-            
-            if new_cards:
-                print(f"\nFound {len(new_cards)} new diary entries to process")
+        # Hook the page before 'load older' clicks so every page's JSON is recorded
+        self.capture = self.start_capture()
+        
+        checkpoint = Checkpoint(self.checkpoint_dir, self.child_id,
+                                interval=self.config.get('checkpoint_interval', 30))
+        pagination_depth = 0
+        if self.resume and checkpoint.resumable:
+            print(f"Resuming: {len(checkpoint.processed_cards)} diary entries already done")
+            pagination_depth = self.fast_forward(checkpoint.pagination_depth)
+        else:
+            checkpoint.reset()
+        processed_cards = checkpoint.processed_cards
+        # Cards whose photos didn't all make it; the walk stays resumable
+        walk = {'child_id': self.child_id, 'checkpoint': checkpoint, 'failed_cards': set(), 'failed_dates': set(),
+                'started_at': started_at, 'stopped_early': False}
+        
+        # Everything older than this is already on disk, stop walking there
+        synced_cutoff = self.synced_cutoff()
+        if synced_cutoff:
+            print(f"Entries before {synced_cutoff} are already synced, only checking {synced_cutoff} and newer")
+        since = self.date_cutoff()
+        if since or self.until:
+            print(f"Only processing entries from {since or 'the start'} to {self.until or 'today'}")
+        
+        # Stopped at the date cutoff or the synced frontier, before the oldest entry
+        stopped_early = False
+        try:
+            while not stopped_early:
+                # Read the cards added since the last page (or captured diary JSON) in one round-trip
+                with self.metrics.span('card_parsing'):
+                    entries = self.read_entries()
+                    
+                    # Process new cards only
+                    new_cards = []
+                    for card, date in entries:
+                        date_str = date.strftime('%Y-%m-%d')
+                        if self.until and date_str > self.until:
+                            continue
+                        if card['key'] not in processed_cards:
+                            new_cards.append((card, date, date_str))
                 
-                for i, (card, date, date_str) in enumerate(new_cards, 1):
-                    try:
-                        print(f"\n[{i}/{len(new_cards)}] Processing {date_str}...")
-                        
-                        # Download photos for this date
-                        downloaded = self.download_photos_for_date(card, child_name, date)
-                        total_downloaded += downloaded
-                        processed_dates.add(date_str)
-                        
-                        print(f"  Downloaded {downloaded} photos")
+                if new_cards:
+                    print(f"\nFound {len(new_cards)} new diary entries to process")
+                    
+                    for i, (card, date, date_str) in enumerate(new_cards, 1):
+                        if synced_cutoff and date_str < synced_cutoff:
+                            print(f"\nReached already synced {date_str}, stopping")
+                            stopped_early = True
+                            break
+                        if since and date_str < since:
+                            print(f"\nReached {date_str}, older than {since}, stopping")
+                            stopped_early = True
+                            break
                         
-                    except Exception as e:
-                        print(f"  Error processing card: {e}")
-                        continue
-            
-            # Try to load more dates
-            if not self.load_more_dates():
-                # No more dates to load
-                break
+                        try:
+                            print(f"\n[{i}/{len(new_cards)}] Processing {date_str}...")
+                            
+                            # Download photos for this date
+                            self.metrics.set_context(self.child_id, date_str)
+                            # Grid mode: no viewer unless a thumbnail gives no usable URL
+                            urls = card['urls']
+                            if urls is None and self.grid_mode:
+                                urls = self.grid_urls(card)
+                                if urls is None:
+                                    print("  Could not derive full-size URLs from thumbnails, using the viewer")
+                            # With the pipeline the card counts as done once its queued photos are downloaded
+                            if self.pipeline:
+                                self.pipeline.open_card(card['key'], lambda key, ok, date_str=date_str:
+                                                        self.card_finished(walk, key, ok, date_str))
+                            card_ok = False
+                            failed_before = self.failed_photos
+                            try:
+                                with self.metrics.span('date'):
+                                    downloaded = self.download_photos_for_date(
+                                        card['element'], child_name, date, thumbnails=card['thumbnails'],
+                                        urls=urls, card_key=card['key']
+                                    )
+                                card_ok = True
+                            finally:
+                                if self.pipeline:
+                                    self.pipeline.close_card(card['key'],
+                                                             ok=card_ok and self.failed_photos == failed_before)
+                            total_downloaded += downloaded
+                            if not self.pipeline:
+                                if self.failed_photos > failed_before:
+                                    self.card_failed(walk, card['key'], date_str)
+                                else:
+                                    checkpoint.mark_card(card['key'])
+                            
+                            if not self.pipeline:
+                                print(f"  Downloaded {downloaded} photos")
+                            
+                        except Exception as e:
+                            print(f"  Error processing card: {e}")
+                            self.card_failed(walk, card['key'], date_str)
+                            continue
+                
+                if stopped_early:
+                    break
+                
+                self.prune_processed_cards()
+                
+                # Try to load more dates
+                if not self.load_more_dates():
+                    # No more dates to load
+                    break
+                pagination_depth += 1
+                checkpoint.set_pagination_depth(pagination_depth)
+        finally:
+            # Keep progress when interrupted or crashing
+            checkpoint.save(force=True)
+            self.archive.save(force=True)
         
+        walk['stopped_early'] = stopped_early
+        if self.pipeline:
+            # Queued photos may still be downloading; DownloadSession closes the walk after the pipeline
+            self.pending_walks.append(walk)
+        else:
+            self.complete_walk(walk)
         return total_downloaded
\ No newline at end of file
@@ -0,0 +1,297 @@
+import os
+import sys
+import time
+import asyncio
+import hashlib
+import threading
+import concurrent.futures
+from http.cookies import SimpleCookie
+from yarl import URL
+import aiohttp
+from http_downloader import CHUNK_SIZE, IntegrityError, SignatureCheck, temp_path_for
+from download_pipeline import DownloadPipeline
+from rate_control import AdaptiveRateController, is_retryable
+
+class ProgressLine:
+    def __init__(self, interval=0.5):
+        """One self-overwriting status line: photos, bytes/sec and ETA"""
+        self.lock = threading.Lock()
+        self.interval = interval
+        self.started_at = time.time()
+        self.last_shown = 0.0
+        self.total = 0
+        self.done = 0
+        self.bytes = 0
+
+    def add_total(self, count=1):
+        with self.lock:
+            self.total += count
+
+    def add_bytes(self, count):
+        with self.lock:
+            self.bytes += count
+        self.show()
+
+    def add_done(self):
+        with self.lock:
+            self.done += 1
+        self.show()
+
+    def line(self):
+        """Current status text"""
+        elapsed = max(time.time() - self.started_at, 1e-6)
+        rate = self.bytes / elapsed
+        per_photo = elapsed / self.done if self.done else None
+        remaining = self.total - self.done
+        eta = f"{int(remaining * per_photo // 60)}:{int(remaining * per_photo % 60):02d}" if per_photo else "?"
+        return (f"  ↓ {self.done}/{self.total} photos, {self.bytes / 1e6:.1f} MB, "
+                f"{rate / 1e6:.2f} MB/s, ETA {eta}")
+
+    def show(self, force=False):
+        """Redraw at most every `interval` seconds"""
+        now = time.time()
+        if not force and now - self.last_shown < self.interval:
+            return
+        self.last_shown = now
+        sys.stdout.write('\r' + self.line() + '\033[K')
+        sys.stdout.flush()
+
+    def finish(self):
+        self.show(force=True)
+        sys.stdout.write('\n')
+
+class AsyncDownloader:
+    def __init__(self, driver, config, rate=None):
+        """One event loop and one pooled aiohttp session, many requests in flight"""
+        self.driver = driver
+        self.config = config
+        self.rate = rate or AdaptiveRateController(config)
+        self.concurrency = max(1, int(config.get('download_concurrency', 64)))
+        # Threads for PhotoStore.store_many; each just waits on the event loop
+        self.workers = self.rate.max_limit
+        # The rate controller's AIMD limit gates requests in flight, up to download_concurrency;
+        # start at the top and let throttling halve it
+        self.rate.max_limit = max(self.rate.max_limit, self.concurrency)
+        self.rate.limit = float(self.rate.max_limit)
+        self.active = 0
+        self.timeout = config.get('download_timeout', 30)
+        self.progress = ProgressLine()
+        self.close_lock = threading.Lock()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="async-downloads", daemon=True)
+        self.thread.start()
+        self.session, self.slot_freed = self.run(self.create_session())
+
+    def run(self, coro):
+        """Run a coroutine on the download loop from any thread and wait for it"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def create_session(self):
+        """Connection pool sized to download_concurrency; cookies for any host incl. local test servers"""
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.concurrency)
+        session = aiohttp.ClientSession(
+            connector=connector,
+            cookie_jar=aiohttp.CookieJar(unsafe=True),
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=self.timeout),
+        )
+        return session, asyncio.Condition()
+
+    async def acquire_slot(self):
+        """Wait out a throttling pause and until fewer requests than the current limit are in flight"""
+        while True:
+            pause = self.rate.paused_until - time.time()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            elif self.active < int(self.rate.limit):
+                self.active += 1
+                return
+            else:
+                async with self.slot_freed:
+                    await self.slot_freed.wait()
+
+    async def release_slot(self):
+        self.active -= 1
+        async with self.slot_freed:
+            self.slot_freed.notify_all()
+
+    def sync_cookies(self):
+        """Copy cookies and user agent from the Selenium session"""
+        user_agent = None
+        try:
+            user_agent = self.driver.execute_script("return navigator.userAgent;")
+        except:
+            pass
+        cookies = self.driver.get_cookies()
+        self.run(self._set_cookies(cookies, user_agent))
+
+    async def _set_cookies(self, cookies, user_agent):
+        if user_agent:
+            self.session.headers['User-Agent'] = user_agent
+        for cookie in cookies:
+            morsel = SimpleCookie()
+            morsel[cookie['name']] = cookie['value']
+            morsel[cookie['name']]['domain'] = cookie.get('domain', '')
+            morsel[cookie['name']]['path'] = cookie.get('path', '/')
+            domain = cookie.get('domain', '').lstrip('.')
+            self.session.cookie_jar.update_cookies(morsel, response_url=URL(f"https://{domain}/"))
+
+    async def fetch(self, url, dest_path):
+        """Stream an image into a temp file beside dest_path, validating and hashing it, then rename.
+        Returns (True, file info) or (False, reason)"""
+        tmp_path = temp_path_for(dest_path)
+        await self.acquire_slot()
+        try:
+            started = time.time()
+            try:
+                async with self.session.get(url) as response:
+                    if response.status != 200:
+                        self.rate.report_failure(response.status, response.headers.get('Retry-After'))
+                        return False, f"HTTP {response.status}"
+                    expected_size = response.content_length
+
+                    sha = hashlib.sha256()
+                    size = 0
+                    signature = SignatureCheck(response.headers.get('Content-Type'))
+                    # Only one chunk per request is held in memory, however many are in flight;
+                    # disk writes run in threads so a slow disk doesn't stall the other streams
+                    f = await asyncio.to_thread(open, tmp_path, 'wb')
+                    try:
+                        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                            chunk = signature.feed(chunk)
+                            if chunk:
+                                await asyncio.to_thread(f.write, chunk)
+                            sha.update(chunk)
+                            size += len(chunk)
+                            self.progress.add_bytes(len(chunk))
+                        # A body shorter than the signature, or none at all
+                        chunk = signature.finish()
+                        await asyncio.to_thread(f.write, chunk)
+                        sha.update(chunk)
+                        size += len(chunk)
+                        self.progress.add_bytes(len(chunk))
+                    finally:
+                        await asyncio.to_thread(f.close)
+                    if expected_size is not None and size != expected_size:
+                        raise IntegrityError(f"truncated: {size} of {expected_size} bytes")
+                await asyncio.to_thread(os.replace, tmp_path, dest_path)
+                self.rate.report_success(time.time() - started)
+                return True, {'path': dest_path, 'size': size, 'sha256': sha.hexdigest()}
+            except asyncio.CancelledError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            except Exception as e:
+                if not isinstance(e, IntegrityError):
+                    self.rate.report_failure()
+                if os.path.exists(tmp_path):
+                    await asyncio.to_thread(os.remove, tmp_path)
+                return False, str(e) or e.__class__.__name__
+        finally:
+            await self.release_slot()
+
+    def download(self, url, dest_path):
+        """Blocking download, same contract as HttpDownloader.download"""
+        return self.run(self.fetch(url, dest_path))
+
+    def close(self):
+        """Close pooled connections and stop the loop (safe to call more than once)"""
+        with self.close_lock:
+            if self.loop.is_closed():
+                return
+            self.run(self.session.close())
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
+
+class AsyncDownloadPipeline(DownloadPipeline):
+    def __init__(self, store, path_builder, config):
+        """Discovery → download pipeline where every queued photo is a task on the download loop"""
+        super().__init__(store, path_builder, config)
+        self.downloader = store.downloader
+        self.progress = self.downloader.progress
+        # Backpressure: how many photos may be queued or in flight at once
+        self.slots = threading.Semaphore(max(config.get('queue_size', 100), self.downloader.concurrency))
+        self.futures = set()
+
+    def start(self):
+        """Nothing to spawn, the download loop is already running"""
+        self.started_at = time.time()
+        self.progress.started_at = self.started_at
+
+    def submit(self, job):
+        """Schedule a job, blocking while too many are pending. Returns False after shutdown"""
+        started = time.time()
+        while not self.stop_event.is_set():
+            if self.slots.acquire(timeout=0.5):
+                break
+        else:
+            return False
+        self.blocked_seconds += time.time() - started
+        self.count_card_job(job)
+        self.stats['discovered'].add()
+        self.progress.add_total()
+        future = asyncio.run_coroutine_threadsafe(self._process(job), self.downloader.loop)
+        with self.idle:
+            self.futures.add(future)
+        future.add_done_callback(self._done)
+        return True
+
+    def _done(self, future):
+        with self.idle:
+            self.futures.discard(future)
+        self.slots.release()
+
+    async def _process(self, job):
+        """Download one job to its organized location, retrying with backoff"""
+        started = time.time()
+        child_id = job.child_id or job.child
+        date_str = job.date.strftime('%Y-%m-%d')
+        # Manifest, file links and archive saves block, so they run off the download loop
+        dest_path = await asyncio.to_thread(self.path_builder, job.child, job.date, job.index, job.url)
+        known = await asyncio.to_thread(self.store.lookup, child_id, date_str, job.url, dest_path)
+        if known:
+            status, result = known
+        else:
+            for attempt in range(self.rate.max_retries + 1):
+                fetch_started = time.time()
+                success, result = await self.downloader.fetch(job.url, dest_path)
+                await asyncio.to_thread(self.store.record_timing, child_id, date_str,
+                                        time.time() - fetch_started, success)
+                if success or not is_retryable(result) or attempt == self.rate.max_retries:
+                    break
+                self.stats['retried'].add()
+                await asyncio.sleep(self.rate.retry_delay(attempt))
+            if success:
+                status, result = await asyncio.to_thread(self.store.finish, child_id, date_str,
+                                                         job.url, dest_path, result)
+            else:
+                status = 'failed'
+        stage = 'skipped' if status == 'exists' else status
+        self.stats[stage].add(time.time() - started)
+        self.progress.add_done()
+        if status == 'failed':
+            print(f"\n    Photo {date_str} #{job.index} failed: {result}")
+        if job.card is not None:
+            self.card_job_done(job.card, status != 'failed')
+
+    def close(self):
+        """Wait until every scheduled download is done"""
+        with self.idle:
+            pending = list(self.futures)
+        concurrent.futures.wait(pending)
+        self.progress.finish()
+
+    def shutdown(self):
+        """Cancel scheduled downloads and wait for them to wind down"""
+        self.stop_event.set()
+        with self.idle:
+            pending = list(self.futures)
+        for future in pending:
+            future.cancel()
+        concurrent.futures.wait(pending, timeout=self.downloader.timeout)
+
+    def summary_lines(self):
+        """Per-stage throughput plus bytes/sec"""
+        lines = super().summary_lines()
+        lines.append(self.progress.line().strip())
+        return lines
@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+import time
+import fcntl
+import shutil
+import signal
+from datetime import datetime
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.firefox.options import Options
+from selenium.webdriver.firefox.remote_connection import FirefoxRemoteConnection
+from firefox_session import get_firefox_driver, create_run_download_dir
+from dom_extract import LOGIN_PAGE_JS
+
+def session_dir(config):
+    """Where the daemon's session file, lock and cookie jar live"""
+    return config.get('session_dir') or os.path.join(config.get('download_path', 'downloads'), '.session')
+
+class AttachedFirefox(webdriver.Remote):
+    def __init__(self, executor_url, session_id, capabilities):
+        """WebDriver for a Firefox session started by another process (the daemon)"""
+        self.attached_session_id = session_id
+        self.attached_capabilities = capabilities
+        super().__init__(command_executor=FirefoxRemoteConnection(remote_server_addr=executor_url),
+                         options=Options())
+        self.attached = True
+
+    def start_session(self, capabilities):
+        # Reuse the running session instead of asking geckodriver for a new one
+        self.session_id = self.attached_session_id
+        self.caps = self.attached_capabilities
+
+def attach_to_daemon(config):
+    """Driver for the warm daemon browser, or None if no daemon is running"""
+    path = os.path.join(session_dir(config), 'daemon.json')
+    try:
+        with open(path, 'r') as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return None
+    started = time.time()
+    try:
+        driver = AttachedFirefox(info['executor_url'], info['session_id'], info['capabilities'])
+        # Raises if the daemon's session is gone
+        driver.current_url
+    except Exception as e:
+        print(f"Daemon browser from {info.get('started_at', '?')} is not reachable ({e.__class__.__name__}), starting Firefox")
+        return None
+    driver.startup_seconds = time.time() - started
+    driver.download_dir = info.get('download_dir')
+    print(f"Attached to running Firefox (pid {info.get('pid')}) in {driver.startup_seconds:.2f} seconds")
+    return driver
+
+def close_driver(driver):
+    """Quit a browser we started; leave the daemon's browser running"""
+    if getattr(driver, 'attached', False):
+        return
+    driver.quit()
+
+class BrowserLock:
+    def __init__(self, config):
+        """Exclusive use of the daemon browser between the daemon and runs (flock)"""
+        directory = session_dir(config)
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, 'daemon.lock')
+        self.file = None
+
+    def acquire(self, wait=True):
+        """True once the lock is held; False if busy and wait is off"""
+        self.file = open(self.path, 'w')
+        try:
+            fcntl.flock(self.file, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            self.release()
+            return False
+
+    def release(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+def export_cookies(driver, config):
+    """Save the browser's eliis cookies (owner-readable only) for offline login checks"""
+    path = os.path.join(session_dir(config), 'cookies.json')
+    tmp_path = path + '.tmp'
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(driver.get_cookies(), f)
+    os.replace(tmp_path, path)
+
+def cookie_jar_expired(config):
+    """Expiry time of the exported eliis cookies if they have all expired, else None
+
+    Session cookies (no expiry) and a missing jar count as possibly valid;
+    the page check after navigation is what decides.
+    """
+    try:
+        with open(os.path.join(session_dir(config), 'cookies.json'), 'r') as f:
+            cookies = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not cookies or any('expiry' not in cookie for cookie in cookies):
+        return None
+    newest = max(cookie['expiry'] for cookie in cookies)
+    return datetime.fromtimestamp(newest) if newest < time.time() else None
+
+def is_logged_in(driver):
+    """False if the current page is eliis' login form"""
+    try:
+        return not driver.execute_script(LOGIN_PAGE_JS)
+    except WebDriverException:
+        return False
+
+def run_daemon(config):
+    """Keep one Firefox running for later runs to attach to, until Ctrl-C/SIGTERM"""
+    directory = session_dir(config)
+    os.makedirs(directory, exist_ok=True)
+    session_path = os.path.join(directory, 'daemon.json')
+    download_dir = create_run_download_dir(config)
+    driver = get_firefox_driver(config['firefox_profile_path'], download_dir=download_dir, config=config)
+    # SIGTERM (systemd stop) cleans up like Ctrl-C
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+
+    base_url = config.get('base_url', "https://eliis.eu").rstrip("/")
+    first_child = config['children'][0]['id']
+    refresh = config.get('daemon_refresh_seconds', 300)
+    try:
+        driver.get(f"{base_url}/child/{first_child}/diary")
+        info = {
+            'executor_url': driver.service.service_url,
+            'session_id': driver.session_id,
+            'capabilities': driver.caps,
+            'download_dir': download_dir,
+            'pid': os.getpid(),
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        # Session id + driver URL are enough to control the logged-in browser: owner-readable only
+        fd = os.open(session_path + '.tmp', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(info, f, indent=2)
+        os.replace(session_path + '.tmp', session_path)
+        print(f"Browser ready, runs will attach to it (refreshing every {refresh}s, Ctrl-C to stop)")
+
+        lock = BrowserLock(config)
+        while True:
+            # Keep the login alive, but never touch the browser while a run uses it
+            if lock.acquire(wait=False):
+                try:
+                    driver.refresh()
+                    if is_logged_in(driver):
+                        export_cookies(driver, config)
+                    else:
+                        print(f"{datetime.now():%H:%M} Logged out of eliis.eu, log in in the daemon's Firefox window")
+                finally:
+                    lock.release()
+            time.sleep(refresh)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if os.path.exists(session_path):
+            os.remove(session_path)
+        driver.quit()
+        shutil.rmtree(download_dir, ignore_errors=True)
+        print("Daemon browser stopped")
@@ -0,0 +1,83 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime
+
+class Checkpoint:
+    def __init__(self, directory, child_id, interval=30):
+        """Per-child progress file so an interrupted run can be resumed"""
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{child_id}.json")
+        self.interval = interval
+        self.last_saved = 0
+        # Cards are marked from download workers once their photos are in
+        self.lock = threading.RLock()
+        self.data = self.load()
+
+    def load(self):
+        """Read checkpoint from disk, empty state if missing or unreadable"""
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            # Older checkpoints kept one entry per date: that was its first card
+            legacy = [f"{date_str}#1" for date_str in data.pop('processed_dates', [])]
+            data['processed_cards'] = set(data.get('processed_cards', legacy))
+            return data
+        except (OSError, ValueError):
+            return self.empty()
+
+    @staticmethod
+    def empty():
+        """Fresh checkpoint state"""
+        return {'processed_cards': set(), 'pagination_depth': 0, 'completed': False}
+
+    def reset(self):
+        """Start over (a new, non-resumed walk)"""
+        self.data = self.empty()
+        self.save(force=True)
+
+    @property
+    def resumable(self):
+        """True if an earlier walk stopped partway"""
+        return not self.data['completed'] and bool(self.data['processed_cards'])
+
+    @property
+    def processed_cards(self):
+        """Keys of finished diary cards (entry id, or 'YYYY-MM-DD#n' for the n-th card of a date)"""
+        return self.data['processed_cards']
+
+    @property
+    def pagination_depth(self):
+        return self.data['pagination_depth']
+
+    def mark_card(self, key):
+        """Record a finished diary card, saves periodically"""
+        with self.lock:
+            self.data['processed_cards'].add(key)
+            self.save()
+
+    def set_pagination_depth(self, depth):
+        """Record how many times 'load older' was clicked"""
+        self.data['pagination_depth'] = max(depth, self.data['pagination_depth'])
+        self.save()
+
+    def mark_completed(self):
+        """Whole diary walked, nothing to resume"""
+        self.data['completed'] = True
+        self.save(force=True)
+
+    def save(self, force=False):
+        """Write atomically, at most once per interval unless forced"""
+        with self.lock:
+            now = time.time()
+            if not force and now - self.last_saved < self.interval:
+                return
+            data = dict(self.data)
+            data['processed_cards'] = sorted(self.data['processed_cards'])
+            data['updated_at'] = datetime.now().isoformat(timespec='seconds')
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+            self.last_saved = now
@@ -0,0 +1,63 @@
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+# Full month names and the abbreviations eliis uses in compact views
+ESTONIAN_MONTHS = {
+    'jaanuar': 1, 'veebruar': 2, 'märts': 3, 'aprill': 4, 'mai': 5, 'juuni': 6,
+    'juuli': 7, 'august': 8, 'september': 9, 'oktoober': 10, 'november': 11, 'detsember': 12,
+    'jaan': 1, 'veebr': 2, 'märts': 3, 'apr': 4, 'aug': 8, 'sept': 9, 'okt': 10, 'nov': 11, 'dets': 12,
+}
+
+# 'reede, 30 mai 2025', '30. mai 2025', '30 mai, 2025', '30. veebr. 2025'
+TEXT_DATE = re.compile(r'(\d{1,2})\.?\s+([^\W\d_]+)\.?,?\s+(\d{4})', re.IGNORECASE)
+# '30.05.2025', '30/05/2025'
+NUMERIC_DATE = re.compile(r'\b(\d{1,2})[./](\d{1,2})[./](\d{4})\b')
+# '2025-05-30' (also inside datetime attributes like '2025-05-30T08:00')
+ISO_DATE = re.compile(r'\b(\d{4})-(\d{1,2})-(\d{1,2})(?!\d)')
+# Recent entries: 'Täna' (today), 'Eile' (yesterday), 'Üleeile', '2 tundi tagasi' (2 hours ago)
+RELATIVE_DAYS = {'täna': 0, 'eile': 1, 'üleeile': 2}
+# Only at the start of the text, so a post saying 'täna käisime...' isn't read as a date
+RELATIVE_WORD = re.compile(r'\s*(täna|eile|üleeile)\b', re.IGNORECASE)
+TIME_AGO = re.compile(r'\b(\d+)\s+(minut|minutit|tund|tundi|päev|päeva)\s+tagasi\b', re.IGNORECASE)
+AGO_UNITS = {'minut': 'minutes', 'minutit': 'minutes', 'tund': 'hours', 'tundi': 'hours', 'päev': 'days', 'päeva': 'days'}
+
+def parse_estonian_date(text):
+    """Date shown on eliis ('reede, 30 mai 2025', '30.05.2025', '2025-05-30', 'Eile'), or None if unreadable"""
+    if not text:
+        return None
+    return parse_absolute_date(text) or parse_relative_date(text)
+
+def parse_relative_date(text):
+    """Date for 'Täna', 'Eile' or '3 tundi tagasi'; not cached, since they mean another day after midnight"""
+    now = datetime.now()
+    today = datetime(now.year, now.month, now.day)
+    match = RELATIVE_WORD.match(text)
+    if match:
+        return today - timedelta(days=RELATIVE_DAYS[match.group(1).lower()])
+    match = TIME_AGO.search(text)
+    if match:
+        then = now - timedelta(**{AGO_UNITS[match.group(2).lower()]: int(match.group(1))})
+        return datetime(then.year, then.month, then.day)
+    return None
+
+@lru_cache(maxsize=4096)
+def parse_absolute_date(text):
+    """Date from a text that names it, or None"""
+    for match in TEXT_DATE.finditer(text):
+        month = ESTONIAN_MONTHS.get(match.group(2).lower())
+        if month:
+            return _make_date(int(match.group(3)), month, int(match.group(1)))
+    match = NUMERIC_DATE.search(text)
+    if match:
+        return _make_date(int(match.group(3)), int(match.group(2)), int(match.group(1)))
+    match = ISO_DATE.search(text)
+    if match:
+        return _make_date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+    return None
+
+def _make_date(year, month, day):
+    try:
+        return datetime(year, month, day)
+    except ValueError:
+        return None
@@ -0,0 +1,98 @@
+# JavaScript snippets that read the diary DOM in a single WebDriver round-trip
+
+# Returns every diary card from index arguments[0] on as
+# {index, element, entry_id, date_text, thumbnail_count, thumbnails, thumbnail_urls, full_urls}.
+# entry_id is the card's own id attribute if the page gives it one, else null.
+# thumbnail_urls/full_urls line up with thumbnails (null where nothing was found);
+# full_urls only come from attributes that hold the original image
+EXTRACT_CARDS_JS = """
+const start = arguments[0] || 0;
+const urlFor = (thumb) => {
+    for (const attr of ['data-full', 'data-src', 'data-original', 'data-url']) {
+        const value = thumb.getAttribute(attr);
+        if (value) return value;
+    }
+    const img = thumb.tagName === 'IMG' ? thumb : thumb.querySelector('img');
+    if (img && img.src) return img.src;
+    const match = /url\\(["']?([^"')]+)["']?\\)/.exec(getComputedStyle(thumb).backgroundImage || '');
+    return match ? match[1] : null;
+};
+const cards = Array.from(document.querySelectorAll('div.card.p-3.mb-3'));
+return cards.slice(start).map((card, i) => {
+    const dateElem = card.querySelector('.text-muted');
+    const thumbs = Array.from(card.querySelectorAll('.e3-image-thumbnail'));
+    return {
+        index: start + i,
+        element: card,
+        entry_id: card.getAttribute('data-entry-id') || card.getAttribute('data-id') || card.id || null,
+        date_text: dateElem ? dateElem.innerText.trim() : '',
+        thumbnail_count: thumbs.length,
+        thumbnails: thumbs,
+        thumbnail_urls: thumbs.map(urlFor),
+        full_urls: thumbs.map((t) => {
+            const value = t.getAttribute('data-full') || t.getAttribute('data-original');
+            return value ? new URL(value, document.baseURI).href : null;
+        })
+    };
+});
+"""
+
+# Empties diary cards arguments[0]..arguments[1]-1 (already processed) so their
+# thumbnails and images can be freed; the emptied card stays as a hidden placeholder
+# so card indexes and counts don't shift. Returns how many were emptied
+PRUNE_CARDS_JS = """
+const cards = Array.from(document.querySelectorAll('div.card.p-3.mb-3')).slice(arguments[0], arguments[1]);
+let pruned = 0;
+for (const card of cards) {
+    if (card.dataset.eliisPruned) continue;
+    card.replaceChildren();
+    card.style.display = 'none';
+    card.dataset.eliisPruned = '1';
+    pruned++;
+}
+return pruned;
+"""
+
+# Clicks every 'Kuva rohkem' button so all thumbnails of all cards are in the DOM,
+# returns how many were clicked
+EXPAND_CARDS_JS = """
+const buttons = Array.from(document.querySelectorAll('div.card.p-3.mb-3 button'))
+    .filter((btn) => btn.textContent.includes('Kuva rohkem'));
+buttons.forEach((btn) => btn.click());
+return buttons.length;
+"""
+
+# Viewer elements, most specific first; LocatorCache remembers which one matched
+FORWARD_ARROW_PATH = "button svg path[d*='M8.59,16.58L13.17,12']"
+# Any icon button matches this one, so it is a last resort and never remembered
+FORWARD_ARROW_FALLBACK = "button svg[viewBox='0 0 24 24']"
+FORWARD_ARROW_SELECTORS = [
+    FORWARD_ARROW_PATH,
+    FORWARD_ARROW_FALLBACK,
+    ".mdi-chevron-right",
+    ".mdi-arrow-right",
+    "[aria-label*='next']",
+    "[aria-label*='Next']",
+    "button[title*='next']",
+]
+
+VIEWER_IMAGE_SELECTORS = [
+    "img.e3-img-full",
+    ".modal img",
+    ".photo-viewer img",
+    "img[style*='display: block']",
+    "img:not(.e3-image-thumbnail)",
+]
+
+CLOSE_BUTTON_SELECTORS = [
+    ".mdi-close",
+    "[aria-label='close']",
+    "button.close",
+    ".modal-close",
+]
+
+# True when the current page is eliis' login form rather than the diary
+LOGIN_PAGE_JS = """
+return !!document.querySelector('input[type="password"]')
+    || /(login|logi-sisse|sign-?in|auth)/i.test(location.pathname);
+"""
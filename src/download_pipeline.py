@@ -0,0 +1,216 @@
+import queue
+import threading
+import time
+from collections import namedtuple
+from rate_control import is_retryable
+
+DownloadJob = namedtuple('DownloadJob', ['child', 'date', 'index', 'url', 'child_id', 'attempt', 'card'],
+                         defaults=(None, 0, None))
+
+_STOP = object()
+
+class StageStats:
+    def __init__(self):
+        """Thread-safe counters for one pipeline stage"""
+        self.lock = threading.Lock()
+        self.count = 0
+        self.busy_seconds = 0.0
+        self.first_at = None
+        self.last_at = None
+
+    def add(self, busy_seconds=0.0):
+        """Record one finished item and the time spent on it"""
+        now = time.time()
+        with self.lock:
+            self.count += 1
+            self.busy_seconds += busy_seconds
+            if self.first_at is None:
+                self.first_at = now
+            self.last_at = now
+
+    def throughput(self, elapsed):
+        """Items per second over the given wall time"""
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+class DownloadPipeline:
+    def __init__(self, store, path_builder, config):
+        """Bounded producer/consumer queue between URL discovery and downloads"""
+        self.store = store
+        self.path_builder = path_builder
+        self.rate = store.downloader.rate
+        # One thread per slot the rate controller may open up
+        self.workers = self.rate.max_limit
+        self.queue = queue.Queue(maxsize=config.get('queue_size', 100))
+        # Jobs submitted but not finished, including ones waiting to be retried
+        self.outstanding = 0
+        self.idle = threading.Condition()
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.started_at = None
+        self.stats = {
+            'discovered': StageStats(),
+            'downloaded': StageStats(),
+            'linked': StageStats(),
+            'skipped': StageStats(),
+            'failed': StageStats(),
+            'retried': StageStats(),
+        }
+        # Time the producer spent blocked on a full queue (backpressure)
+        self.blocked_seconds = 0.0
+        # Diary card key -> [unfinished jobs (+1 while still queueing), any failed, callback]
+        self.cards = {}
+
+    def start(self):
+        """Start download worker threads"""
+        self.started_at = time.time()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"download-{i + 1}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def open_card(self, key, on_done):
+        """Start queueing a card's jobs; on_done(key, ok) runs once all of them are done for good"""
+        with self.idle:
+            self.cards[key] = [1, False, on_done]
+
+    def close_card(self, key, ok=True):
+        """All jobs of the card are queued (ok=False: the card failed before that)"""
+        self.card_job_done(key, ok)
+
+    def card_job_done(self, key, ok):
+        """One job of a card is done for good; cards left unfinished by a shutdown are never reported"""
+        with self.idle:
+            entry = self.cards.get(key)
+            if entry is None:
+                return
+            entry[0] -= 1
+            entry[1] = entry[1] or not ok
+            if entry[0] > 0:
+                return
+            del self.cards[key]
+        if not self.stop_event.is_set():
+            entry[2](key, not entry[1])
+
+    def submit(self, job):
+        """Queue a job, blocking while the queue is full. Returns False after shutdown"""
+        started = time.time()
+        self.count_card_job(job)
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put(job, timeout=0.5)
+                with self.idle:
+                    self.outstanding += 1
+                self.blocked_seconds += time.time() - started
+                self.stats['discovered'].add()
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def count_card_job(self, job):
+        if job.card is not None:
+            with self.idle:
+                if job.card in self.cards:
+                    self.cards[job.card][0] += 1
+
+    def _worker(self):
+        """Drain jobs from the queue until told to stop"""
+        while True:
+            job = self.queue.get()
+            try:
+                if job is _STOP:
+                    return
+                if self.stop_event.is_set():
+                    self.finish(job, ok=False)
+                    continue
+                try:
+                    self._process(job)
+                except Exception as e:
+                    # A worker that dies would leave the job outstanding and close() waiting forever
+                    print(f"    Photo {job.date.strftime('%Y-%m-%d')} #{job.index} failed: {e}")
+                    self.stats['failed'].add()
+                    self.finish(job, ok=False)
+            finally:
+                self.queue.task_done()
+
+    def _process(self, job):
+        """Download one job to its organized location"""
+        started = time.time()
+        dest_path = self.path_builder(job.child, job.date, job.index, job.url)
+        status, result = self.store.store(
+            job.child_id or job.child, job.date.strftime('%Y-%m-%d'), job.url, dest_path
+        )
+        if status == 'failed' and is_retryable(result) and job.attempt < self.rate.max_retries:
+            self.stats['retried'].add(time.time() - started)
+            self.retry_later(job)
+            return
+        stage = 'skipped' if status == 'exists' else status
+        self.stats[stage].add(time.time() - started)
+        if status == 'failed':
+            print(f"    Photo {job.date.strftime('%Y-%m-%d')} #{job.index} failed: {result}")
+        self.finish(job, ok=status != 'failed')
+
+    def retry_later(self, job):
+        """Put a failed job back on the queue after a jittered backoff"""
+        timer = threading.Timer(self.rate.retry_delay(job.attempt), self._requeue,
+                                args=(job._replace(attempt=job.attempt + 1),))
+        timer.daemon = True
+        timer.start()
+
+    def _requeue(self, job):
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put(job, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+        self.finish(job, ok=False)
+
+    def finish(self, job, ok=True):
+        """Mark one submitted job as done for good"""
+        if job.card is not None:
+            self.card_job_done(job.card, ok)
+        with self.idle:
+            self.outstanding -= 1
+            self.idle.notify_all()
+
+    def close(self):
+        """Wait until all queued jobs (and their retries) are done, then stop workers"""
+        with self.idle:
+            while self.outstanding > 0 and not self.stop_event.is_set():
+                self.idle.wait(0.5)
+        for _ in self.threads:
+            self.queue.put(_STOP)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def shutdown(self):
+        """Drop queued jobs, let in-flight downloads finish and stop workers"""
+        self.stop_event.set()
+        while True:
+            try:
+                self.queue.get_nowait()
+                self.queue.task_done()
+            except queue.Empty:
+                break
+        for _ in self.threads:
+            self.queue.put(_STOP)
+        for thread in self.threads:
+            thread.join(timeout=self.store.downloader.timeout)
+        self.threads = []
+
+    @property
+    def downloaded(self):
+        """Number of photos downloaded so far"""
+        return self.stats['downloaded'].count
+
+    def summary_lines(self):
+        """Human readable per-stage throughput lines"""
+        elapsed = time.time() - self.started_at if self.started_at else 0
+        lines = []
+        for name, stage in self.stats.items():
+            lines.append(f"{name.capitalize()}: {stage.count} ({stage.throughput(elapsed):.2f}/s)")
+        lines.append(f"Discovery blocked on full queue: {self.blocked_seconds:.1f} seconds")
+        lines.append(self.rate.summary_line())
+        return lines
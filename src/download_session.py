@@ -0,0 +1,76 @@
+from arrow_download_handler import ArrowDownloadHandler
+from download_pipeline import DownloadPipeline
+from scraper import EliisScraper
+from waits import Waiter
+
+class DownloadSession:
+    def __init__(self, driver, config, download_dir=None, wait_stats=None, metrics=None):
+        """Wire scraper, download handler and download pipeline for one browser"""
+        self.driver = driver
+        self.config = config
+        self.waiter = Waiter(driver, config, stats=wait_stats, metrics=metrics)
+        self.metrics = self.waiter.metrics
+        self.handler = ArrowDownloadHandler(driver, config, waiter=self.waiter, download_dir=download_dir)
+        self.scraper = EliisScraper(driver, config, waiter=self.waiter)
+        self.pipeline = None
+
+        # Downloads run in background workers while the browser discovers URLs
+        if self.handler.photo_store:
+            pipeline_class = DownloadPipeline
+            if config.get('download_engine', 'threads') == 'asyncio':
+                from async_downloader import AsyncDownloadPipeline
+                pipeline_class = AsyncDownloadPipeline
+            self.pipeline = pipeline_class(self.handler.photo_store, self.handler.get_photo_path, config)
+            self.handler.pipeline = self.pipeline
+
+    def run(self):
+        """Process all configured children, returns number of photos downloaded"""
+        if self.pipeline:
+            self.pipeline.start()
+
+        total = self.scraper.process_all_children(self.handler)
+
+        if self.pipeline:
+            print(f"\nWaiting for remaining downloads...")
+            self.pipeline.close()
+            total = self.pipeline.downloaded
+            if self.pipeline.stop_event.is_set():
+                # Cancelled from another thread while waiting: queued photos were dropped
+                self.handler.save_pending_walks()
+            else:
+                self.handler.complete_walks()
+        if self.handler.postprocessor:
+            print(f"\nFinishing post-processing...")
+            self.handler.postprocessor.close()
+        self.handler.archive.save(force=True)
+        self.close_downloader()
+        return total
+
+    @property
+    def downloaded(self):
+        """Photos downloaded so far"""
+        return self.pipeline.downloaded if self.pipeline else 0
+
+    def cancel(self):
+        """Drop queued downloads and stop download workers"""
+        if self.pipeline:
+            self.pipeline.shutdown()
+            self.handler.save_pending_walks()
+        if self.handler.postprocessor:
+            self.handler.postprocessor.shutdown()
+        self.handler.archive.save(force=True)
+        self.close_downloader()
+
+    def close_downloader(self):
+        """Close the HTTP connection pool (and the asyncio engine's loop thread)"""
+        if self.handler.http_downloader:
+            self.handler.http_downloader.close()
+
+    def summary_lines(self):
+        """Per-stage pipeline throughput lines"""
+        lines = self.pipeline.summary_lines() if self.pipeline else []
+        if self.handler.postprocessor:
+            lines.append(self.handler.postprocessor.summary_line())
+        if self.handler.unparsed_dates:
+            lines.append(f"Skipped entries with unreadable dates: {', '.join(sorted(self.handler.unparsed_dates))}")
+        return lines
@@ -0,0 +1,123 @@
+import os
+import re
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+# inotify event flags (see inotify(7))
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+EVENT_HEADER = struct.Struct('iIII')
+
+class DownloadWatcher:
+    def __init__(self, directory):
+        """Watch a dedicated browser download directory for finished files"""
+        self.directory = directory
+        self.fd = None
+        try:
+            self._init_inotify()
+        except (OSError, AttributeError):
+            # Not on Linux (or no inotify): fall back to listing the directory
+            self.fd = None
+
+    def _init_inotify(self):
+        """Register an inotify watch for completed writes and renames"""
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = libc.inotify_add_watch(fd, os.fsencode(self.directory), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            os.close(fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+        self.fd = fd
+
+    def snapshot(self):
+        """Names currently in the directory, taken before starting a download"""
+        return set(os.listdir(self.directory))
+
+    def _is_complete(self, name):
+        """Firefox writes to name.part and renames when done"""
+        if name.endswith('.part'):
+            return False
+        path = os.path.join(self.directory, name)
+        if os.path.exists(path + '.part'):
+            return False
+        try:
+            return os.path.getsize(path) > 0
+        except OSError:
+            return False
+
+    @staticmethod
+    def _is_expected(name, expected_name):
+        """expected_name itself or Firefox's 'name(N).ext' for a name already taken"""
+        if name == expected_name:
+            return True
+        stem, ext = os.path.splitext(expected_name)
+        return re.fullmatch(re.escape(stem) + r'\(\d+\)' + re.escape(ext), name) is not None
+
+    def _find_new_file(self, known, expected_name=None):
+        """Return path of a finished file that wasn't there before
+
+        With expected_name only that file counts, so a late file from an
+        earlier photo is never taken for the current one.
+        """
+        names = sorted(n for n in os.listdir(self.directory) if n not in known and self._is_complete(n))
+        if expected_name:
+            names = [n for n in names if self._is_expected(n, expected_name)]
+        return os.path.join(self.directory, names[0]) if names else None
+
+    def _read_events(self):
+        """Drain pending inotify events, returns the file names they mention"""
+        names = []
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return names
+            raise
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(buf):
+            _, _, _, length = EVENT_HEADER.unpack_from(buf, offset)
+            offset += EVENT_HEADER.size
+            name = buf[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def wait_for_file(self, known, timeout=10, expected_name=None):
+        """Block until a new finished file appears, returns its path or None"""
+        deadline = time.time() + timeout
+
+        # The download may already have finished before we started waiting
+        found = self._find_new_file(known, expected_name)
+        if found:
+            return found
+
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+
+            if self.fd is None:
+                time.sleep(min(0.1, remaining))
+                found = self._find_new_file(known, expected_name)
+            else:
+                ready, _, _ = select.select([self.fd], [], [], remaining)
+                if not ready:
+                    return None
+                # Events only say something changed; unrelated files keep us waiting
+                self._read_events()
+                found = self._find_new_file(known, expected_name)
+            if found:
+                return found
+
+    def close(self):
+        """Stop watching"""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
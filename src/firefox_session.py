@@ -3,9 +3,60 @@ from selenium.webdriver.firefox.options import Options
 from selenium.webdriver.firefox.service import Service
 import os
 import sys
+import time
+import tempfile
 
-def get_firefox_driver(profile_path):
+# Content types Firefox should save without asking
+DOWNLOAD_MIME_TYPES = "image/jpeg,image/png,image/gif,image/webp,video/mp4,application/octet-stream"
+
+def create_run_download_dir(config):
+    """Create a dedicated directory for this run's browser downloads"""
+    # Inside the archive by default, so finished files are renamed into place, not copied
+    base = config.get('browser_download_root') or os.path.join(config.get('download_path', 'downloads'), '.incoming')
+    os.makedirs(base, exist_ok=True)
+    return tempfile.mkdtemp(prefix="eliis-downloads-", dir=base)
+
+def set_download_preferences(options, download_dir):
+    """Make Firefox save downloads into download_dir without a dialog"""
+    options.set_preference('browser.download.folderList', 2)
+    options.set_preference('browser.download.dir', os.path.abspath(download_dir))
+    options.set_preference('browser.download.useDownloadDir', True)
+    options.set_preference('browser.download.manager.showWhenStarting', False)
+    options.set_preference('browser.download.alwaysOpenPanel', False)
+    options.set_preference('browser.helperApps.neverAsk.saveToDisk', DOWNLOAD_MIME_TYPES)
+
+def set_low_resource_preferences(options, block_images=False):
+    """Turn off rendering work we don't need: fonts, animations, trackers, extra processes"""
+    options.set_preference('browser.display.use_document_fonts', 0)
+    options.set_preference('gfx.downloadable_fonts.enabled', False)
+    options.set_preference('ui.prefersReducedMotion', 1)
+    options.set_preference('toolkit.cosmeticAnimations.enabled', False)
+    options.set_preference('image.animation_mode', 'none')
+    options.set_preference('media.autoplay.default', 5)
+    # Block known third-party trackers/ads
+    options.set_preference('privacy.trackingprotection.enabled', True)
+    options.set_preference('privacy.trackingprotection.socialtracking.enabled', True)
+    options.set_preference('dom.ipc.processCount', 1)
+    options.set_preference('browser.sessionstore.resume_from_crash', False)
+    options.set_preference('browser.cache.disk.enable', False)
+    if block_images:
+        # Only safe when photos are fetched over HTTP: we just need the URLs
+        options.set_preference('permissions.default.image', 2)
+
+def get_geckodriver_service(config):
+    """geckodriver from config, the old default location, or PATH"""
+    path = config.get('geckodriver_path')
+    if not path and os.path.exists('/usr/local/bin/geckodriver'):
+        path = '/usr/local/bin/geckodriver'
+    return Service(path) if path else Service()
+
+def images_blocked(config):
+    """Images are only blocked for HTTP downloads"""
+    return bool(config.get('block_images')) and config.get('download_mode', 'http') == 'http'
+
+def get_firefox_driver(profile_path, download_dir=None, config=None):
     """Connect to existing Firefox session with user profile"""
+    config = config or {}
     if not os.path.exists(profile_path):
         print(f"Error: Firefox profile not found at {profile_path}")
         sys.exit(1)
@@ -13,14 +64,24 @@ def get_firefox_driver(profile_path):
     options = Options()
     options.set_preference('profile', profile_path)
     options.add_argument(f"-profile={profile_path}")
+    if download_dir:
+        set_download_preferences(options, download_dir)
+    if config.get('headless'):
+        options.add_argument("-headless")
+    if config.get('low_resource') or config.get('headless'):
+        set_low_resource_preferences(options, block_images=images_blocked(config))
     
-    service = Service('/usr/local/bin/geckodriver')
+    service = get_geckodriver_service(config)
     
     try:
         print("Starting Firefox with your profile...")
-        print("Note: This will open a new Firefox window.")
-        print("Please log in to eliis.eu if needed.")
+        if not config.get('headless'):
+            print("Note: This will open a new Firefox window.")
+            print("Please log in to eliis.eu if needed.")
+        started = time.time()
         driver = webdriver.Firefox(service=service, options=options)
+        driver.startup_seconds = time.time() - started
+        print(f"Firefox started in {driver.startup_seconds:.1f} seconds")
         return driver
     except Exception as e:
         print(f"Error connecting to Firefox: {e}")
@@ -28,4 +89,41 @@ def get_firefox_driver(profile_path):
         print("1. Make sure Firefox is not running")
         print("2. Try closing all Firefox windows and run again")
         print("3. The script will open its own Firefox window")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+
+def _process_tree(root_pid):
+    """PIDs of a process and all its descendants (Linux /proc)"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                # Field 4 is the parent pid; the name in field 2 may contain spaces
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    
+    pids = [root_pid]
+    for pid in pids:
+        pids.extend(children.get(pid, []))
+    return pids
+
+def get_browser_peak_memory_mb(driver):
+    """Sum of peak resident memory of Firefox and its content processes, None if unknown"""
+    pid = (getattr(driver, 'capabilities', None) or {}).get('moz:processID')
+    if not pid or not os.path.exists('/proc'):
+        return None
+    
+    total_kb = 0
+    for child_pid in _process_tree(pid):
+        try:
+            with open(f'/proc/{child_pid}/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return total_kb / 1024
@@ -0,0 +1,147 @@
+import os
+import time
+import hashlib
+import requests
+from requests.adapters import HTTPAdapter
+from rate_control import AdaptiveRateController
+
+CHUNK_SIZE = 256 * 1024
+# Bytes needed to check every signature in MAGIC_NUMBERS
+SIGNATURE_SIZE = 16
+
+# Leading bytes of the formats eliis serves; anything else (e.g. an HTML login page) is rejected
+MAGIC_NUMBERS = [
+    (0, b'\xff\xd8\xff'),        # JPEG
+    (0, b'\x89PNG\r\n\x1a\n'),   # PNG
+    (0, b'GIF8'),                # GIF
+    (8, b'WEBP'),                # WebP (RIFF....WEBP)
+    (4, b'ftyp'),                # MP4 / MOV / HEIC
+]
+
+class IntegrityError(Exception):
+    """Downloaded bytes are not the complete image that was asked for"""
+
+def looks_like_media(head):
+    """Check the first bytes of a file against known image/video signatures"""
+    return any(head[offset:offset + len(magic)] == magic for offset, magic in MAGIC_NUMBERS)
+
+class SignatureCheck:
+    def __init__(self, content_type):
+        """Hold back the first bytes of a download until there are enough to check its signature"""
+        self.content_type = content_type
+        self.head = b''
+        self.checked = False
+
+    def feed(self, chunk):
+        """Bytes ready to be written; raises IntegrityError if they are not an image"""
+        if self.checked:
+            return chunk
+        self.head += chunk
+        if len(self.head) < SIGNATURE_SIZE:
+            return b''
+        return self.finish()
+
+    def finish(self):
+        """Check what was held back (also for bodies shorter than the signature) and release it"""
+        if not self.checked:
+            self.checked = True
+            if not self.head:
+                raise IntegrityError("empty response")
+            if not looks_like_media(self.head[:SIGNATURE_SIZE]):
+                raise IntegrityError(f"not an image ({self.content_type or 'unknown type'})")
+        head, self.head = self.head, b''
+        return head
+
+def is_media_file(path):
+    """Check a finished file's signature (for browser downloads)"""
+    try:
+        with open(path, 'rb') as f:
+            return looks_like_media(f.read(SIGNATURE_SIZE))
+    except OSError:
+        return False
+
+def temp_path_for(dest_path):
+    """Hidden temp file next to dest_path, so the final rename stays on one filesystem"""
+    directory, name = os.path.split(dest_path)
+    return os.path.join(directory, f".{name}.part")
+
+class HttpDownloader:
+    def __init__(self, driver, config, rate=None):
+        """Initialize pooled HTTP client that reuses the browser session"""
+        self.driver = driver
+        self.config = config
+        self.rate = rate or AdaptiveRateController(config)
+        # Upper bound; the rate controller decides how many actually run at once
+        self.workers = self.rate.max_limit
+        self.timeout = config.get('download_timeout', 30)
+        self.session = self.create_session()
+
+    def create_session(self):
+        """Create keep-alive session with a connection pool sized to the workers"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"Connection": "keep-alive"})
+        return session
+
+    def sync_cookies(self):
+        """Copy cookies and user agent from the Selenium session"""
+        try:
+            user_agent = self.driver.execute_script("return navigator.userAgent;")
+            if user_agent:
+                self.session.headers.update({"User-Agent": user_agent})
+        except:
+            pass
+
+        for cookie in self.driver.get_cookies():
+            self.session.cookies.set(
+                cookie['name'],
+                cookie['value'],
+                domain=cookie.get('domain'),
+                path=cookie.get('path', '/')
+            )
+
+    def download(self, url, dest_path):
+        """Stream an image into a temp file beside dest_path, validating and hashing it on the way,
+        then rename it into place. Returns (True, file info) or (False, reason)"""
+        tmp_path = temp_path_for(dest_path)
+        with self.rate.slot():
+            started = time.time()
+            try:
+                with self.session.get(url, timeout=self.timeout, stream=True) as response:
+                    if response.status_code != 200:
+                        self.rate.report_failure(response.status_code, response.headers.get('Retry-After'))
+                        return False, f"HTTP {response.status_code}"
+                    expected_size = response.headers.get('Content-Length')
+                    expected_size = int(expected_size) if expected_size and expected_size.isdigit() else None
+
+                    sha = hashlib.sha256()
+                    size = 0
+                    signature = SignatureCheck(response.headers.get('Content-Type'))
+                    with open(tmp_path, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                            chunk = signature.feed(chunk)
+                            f.write(chunk)
+                            sha.update(chunk)
+                            size += len(chunk)
+                        # A body shorter than the signature, or none at all
+                        chunk = signature.finish()
+                        f.write(chunk)
+                        sha.update(chunk)
+                        size += len(chunk)
+                    if expected_size is not None and size != expected_size:
+                        raise IntegrityError(f"truncated: {size} of {expected_size} bytes")
+                os.replace(tmp_path, dest_path)
+                self.rate.report_success(time.time() - started)
+                return True, {'path': dest_path, 'size': size, 'sha256': sha.hexdigest()}
+            except Exception as e:
+                if not isinstance(e, IntegrityError):
+                    self.rate.report_failure()
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return False, str(e)
+
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
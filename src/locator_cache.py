@@ -0,0 +1,60 @@
+from selenium.common.exceptions import StaleElementReferenceException
+
+# Checks the remembered element first, then every selector (learned one first), in one round-trip
+FIND_JS = """
+const cached = arguments[0];
+const selectors = arguments[1];
+const ok = (el) => (%(condition)s);
+const read = (el) => (%(value)s);
+if (cached && ok(cached)) return [cached, -1, read(cached)];
+for (let i = 0; i < selectors.length; i++) {
+    for (const el of document.querySelectorAll(selectors[i])) {
+        if (ok(el)) return [el, i, read(el)];
+    }
+}
+return null;
+"""
+
+# JS expression: element is rendered (what is_displayed() checked before)
+VISIBLE = "el.getClientRects().length > 0 && getComputedStyle(el).visibility !== 'hidden'"
+
+class LocatorCache:
+    def __init__(self, driver):
+        """Remember which selector found each viewer element, and the element itself"""
+        self.driver = driver
+        self.learned = {}
+        self.elements = {}
+        self.stale = 0
+
+    def read(self, name, selectors, condition=VISIBLE, value="el", unlearned=()):
+        """Value (JS expression over `el`) of the first element meeting condition, or None
+
+        One WebDriver call: the cached element is tried first, then the learned
+        selector, then the rest. A stale cached element falls back to the search.
+        Matches of `unlearned` selectors (too generic to trust) are not remembered.
+        """
+        ordered = list(selectors)
+        learned = self.learned.get(name)
+        if learned in ordered:
+            ordered.remove(learned)
+            ordered.insert(0, learned)
+        script = FIND_JS % {'condition': condition, 'value': value}
+
+        cached = self.elements.get(name)
+        try:
+            result = self.driver.execute_script(script, cached, ordered)
+        except StaleElementReferenceException:
+            self.stale += 1
+            self.elements.pop(name, None)
+            result = self.driver.execute_script(script, None, ordered)
+
+        if not result:
+            return None
+        element, index, found = result
+        if index >= 0 and ordered[index] in unlearned:
+            self.elements.pop(name, None)
+            return found
+        self.elements[name] = element
+        if index >= 0:
+            self.learned[name] = ordered[index]
+        return found
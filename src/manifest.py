@@ -0,0 +1,228 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from urllib.parse import urlparse
+
+class DownloadManifest:
+    def __init__(self, path, read_only=False):
+        """Open (or create) the SQLite manifest of downloaded photos
+
+        read_only works on an in-memory copy, so nothing (not even a missing
+        manifest) is written to disk.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        if read_only:
+            self.conn = sqlite3.connect(':memory:', check_same_thread=False)
+            if os.path.exists(path):
+                disk = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30)
+                disk.backup(self.conn)
+                disk.close()
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Shared between the browser thread and download workers; parallel browsers
+            # open their own connection and wait on each other's write locks
+            self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.create_tables()
+
+    def create_tables(self):
+        """Create manifest tables if they don't exist"""
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS photos (
+                    child_id TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    url_key TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    size INTEGER,
+                    sha256 TEXT,
+                    downloaded_at TEXT,
+                    PRIMARY KEY (child_id, date, url_key)
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS photos_url_key ON photos (url_key)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS photos_sha256 ON photos (sha256)")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS dates (
+                    child_id TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    photo_count INTEGER NOT NULL,
+                    PRIMARY KEY (child_id, date)
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS children (
+                    child_id TEXT PRIMARY KEY,
+                    walk_completed_at TEXT
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS syncs (
+                    child_id TEXT PRIMARY KEY,
+                    started_at TEXT NOT NULL
+                )
+            """)
+
+    @staticmethod
+    def url_key(url):
+        """Stable key for an image URL (signed query strings change between visits)"""
+        parsed = urlparse(url)
+        return f"{parsed.netloc}{parsed.path}"
+
+    def has_photo(self, child_id, date_str, url):
+        """Check if a photo is recorded and its file is still on disk"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT path FROM photos WHERE child_id = ? AND date = ? AND url_key = ?",
+                (str(child_id), date_str, self.url_key(url))
+            ).fetchone()
+        return bool(row) and os.path.exists(row[0])
+
+    def find_path_by_url(self, url):
+        """Path of the same image object downloaded for any child or date"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path FROM photos WHERE url_key = ?", (self.url_key(url),)
+            ).fetchall()
+        return next((row[0] for row in rows if os.path.exists(row[0])), None)
+
+    def find_path_by_hash(self, sha256, exclude_path=None):
+        """Path of another file with identical content"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path FROM photos WHERE sha256 = ? AND path != ?", (sha256, exclude_path or '')
+            ).fetchall()
+        return next((row[0] for row in rows if os.path.exists(row[0])), None)
+
+    def date_photo_count(self, child_id, date_str):
+        """Photos recorded for one date"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM photos WHERE child_id = ? AND date = ?", (str(child_id), date_str)
+            ).fetchone()[0]
+
+    def average_photo_size(self):
+        """Mean size in bytes of the recorded photos, or None if there are none"""
+        with self.lock:
+            row = self.conn.execute("SELECT AVG(size) FROM photos WHERE size > 0").fetchone()
+        return row[0]
+
+    def hash_for_path(self, path):
+        """Recorded sha256 of a file, or None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT sha256 FROM photos WHERE path = ? AND sha256 IS NOT NULL", (path,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def record_photo(self, child_id, date_str, url, path, size, sha256):
+        """Record a downloaded photo"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO photos VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (str(child_id), date_str, self.url_key(url), path, size, sha256,
+                 datetime.now().isoformat(timespec='seconds'))
+            )
+
+    def update_file(self, path, size, sha256):
+        """New size and hash for a recorded file whose bytes changed"""
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE photos SET size = ?, sha256 = ? WHERE path = ?", (size, sha256, path))
+
+    def record_date(self, child_id, date_str, photo_count):
+        """Record how many photos a date has on the site"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO dates VALUES (?, ?, ?)",
+                (str(child_id), date_str, photo_count)
+            )
+
+    def mark_date_incomplete(self, child_id, date_str):
+        """Count a date as missing photos (even if its photos were never counted), so it caps newest_synced_date"""
+        with self.lock, self.conn:
+            have = self.conn.execute(
+                "SELECT COUNT(*) FROM photos WHERE child_id = ? AND date = ?", (str(child_id), date_str)
+            ).fetchone()[0]
+            row = self.conn.execute(
+                "SELECT photo_count FROM dates WHERE child_id = ? AND date = ?", (str(child_id), date_str)
+            ).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO dates VALUES (?, ?, ?)",
+                (str(child_id), date_str, max(row[0] if row else 0, have + 1))
+            )
+
+    def is_date_synced(self, child_id, date_str, photo_count):
+        """True if every photo of a date (as counted on the site) is downloaded"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT photo_count FROM dates WHERE child_id = ? AND date = ?",
+                (str(child_id), date_str)
+            ).fetchone()
+            if not row:
+                return False
+            have = self.conn.execute(
+                "SELECT COUNT(*) FROM photos WHERE child_id = ? AND date = ?",
+                (str(child_id), date_str)
+            ).fetchone()[0]
+        return have >= max(row[0], photo_count)
+
+    def mark_walk_completed(self, child_id):
+        """Record that every diary entry of a child has been visited at least once"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO children VALUES (?, ?)",
+                (str(child_id), datetime.now().isoformat(timespec='seconds'))
+            )
+
+    def record_sync(self, child_id, started_at):
+        """Remember when the last run that finished for this child started"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO syncs VALUES (?, ?)",
+                (str(child_id), started_at.isoformat(timespec='seconds'))
+            )
+
+    def last_sync(self, child_id):
+        """Start time of the last finished run for a child, or None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT started_at FROM syncs WHERE child_id = ?", (str(child_id),)
+            ).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def newest_synced_date(self, child_id):
+        """Newest date up to which every older date is fully downloaded, or None
+
+        Only known after one complete walk of the diary; an unfinished date
+        (failed download, interrupted run) caps it below that date.
+        """
+        with self.lock:
+            completed = self.conn.execute(
+                "SELECT walk_completed_at FROM children WHERE child_id = ?",
+                (str(child_id),)
+            ).fetchone()
+            if not completed:
+                return None
+            rows = self.conn.execute("""
+                SELECT d.date, d.photo_count, (
+                    SELECT COUNT(*) FROM photos p
+                    WHERE p.child_id = d.child_id AND p.date = d.date
+                ) FROM dates d
+                WHERE d.child_id = ?
+                ORDER BY d.date ASC
+            """, (str(child_id),)).fetchall()
+
+        newest = None
+        for date_str, photo_count, have in rows:
+            if have < photo_count:
+                break
+            newest = date_str
+        return newest
+
+    def close(self):
+        """Close the database"""
+        with self.lock:
+            self.conn.close()
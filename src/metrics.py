@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+def percentile(values, p):
+    """p-th percentile (0-100) with linear interpolation"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+class RunMetrics:
+    def __init__(self):
+        """Timing spans for every phase of a run, tagged with child and date"""
+        self.lock = threading.Lock()
+        self.spans = []
+        self.started_at = time.time()
+        self.context = threading.local()
+
+    def set_context(self, child=None, date=None):
+        """Child/date that spans recorded from this thread belong to"""
+        self.context.child = child
+        self.context.date = date
+
+    def record(self, phase, seconds, child=None, date=None, ok=True):
+        """Add one finished span"""
+        span = {
+            'phase': phase,
+            'seconds': round(seconds, 4),
+            'child': child if child is not None else getattr(self.context, 'child', None),
+            'date': date if date is not None else getattr(self.context, 'date', None),
+            'ok': ok,
+            'at': round(time.time() - self.started_at, 3),
+        }
+        with self.lock:
+            self.spans.append(span)
+
+    @contextmanager
+    def span(self, phase, child=None, date=None):
+        """Time the enclosed block; marked not ok if it raises"""
+        started = time.time()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.record(phase, time.time() - started, child, date, ok)
+
+    def _group(self, key):
+        """Durations grouped by phase, or by (key, phase)"""
+        groups = {}
+        with self.lock:
+            spans = list(self.spans)
+        for span in spans:
+            group = span['phase'] if key is None else (span[key], span['phase'])
+            groups.setdefault(group, []).append(span['seconds'])
+        return groups
+
+    def phase_summary(self):
+        """{phase: {count, total, p50, p95, max}}"""
+        return {
+            phase: {
+                'count': len(values),
+                'total': round(sum(values), 3),
+                'p50': round(percentile(values, 50), 4),
+                'p95': round(percentile(values, 95), 4),
+                'max': round(max(values), 4),
+            }
+            for phase, values in self._group(None).items()
+        }
+
+    def breakdown(self, key):
+        """{child or date: {phase: total seconds}}"""
+        result = {}
+        for (value, phase), values in self._group(key).items():
+            if value is None:
+                continue
+            result.setdefault(str(value), {})[phase] = round(sum(values), 3)
+        return result
+
+    def summary_lines(self):
+        """Per-phase p50/p95 table, slowest total first"""
+        lines = []
+        phases = sorted(self.phase_summary().items(), key=lambda item: item[1]['total'], reverse=True)
+        for phase, s in phases:
+            lines.append(f"{phase}: {s['count']}x, total {s['total']:.1f}s, "
+                         f"p50 {s['p50']:.2f}s, p95 {s['p95']:.2f}s, max {s['max']:.2f}s")
+        return lines
+
+    def write_jsonl(self, path):
+        """One JSON object per span, then per-phase/child/date summaries"""
+        with self.lock:
+            spans = list(self.spans)
+        with open(path, 'w') as f:
+            for span in spans:
+                f.write(json.dumps(dict(span, type='span')) + '\n')
+            for phase, s in self.phase_summary().items():
+                f.write(json.dumps(dict(s, type='phase', phase=phase)) + '\n')
+            for child, phases in self.breakdown('child').items():
+                f.write(json.dumps({'type': 'child', 'child': child, 'phases': phases}) + '\n')
+            for date, phases in self.breakdown('date').items():
+                f.write(json.dumps({'type': 'date', 'date': date, 'phases': phases}) + '\n')
+            f.write(json.dumps({
+                'type': 'run',
+                'finished_at': datetime.now().isoformat(timespec='seconds'),
+                'seconds': round(time.time() - self.started_at, 3),
+            }) + '\n')
+
+    def write_prometheus(self, path):
+        """Prometheus text exposition format"""
+        lines = [
+            "# HELP eliis_phase_seconds Time spent per phase",
+            "# TYPE eliis_phase_seconds summary",
+        ]
+        for phase, s in self.phase_summary().items():
+            lines.append(f'eliis_phase_seconds{{phase="{phase}",quantile="0.5"}} {s["p50"]}')
+            lines.append(f'eliis_phase_seconds{{phase="{phase}",quantile="0.95"}} {s["p95"]}')
+            lines.append(f'eliis_phase_seconds_sum{{phase="{phase}"}} {s["total"]}')
+            lines.append(f'eliis_phase_seconds_count{{phase="{phase}"}} {s["count"]}')
+        lines.append("# HELP eliis_child_phase_seconds_total Time spent per child and phase")
+        lines.append("# TYPE eliis_child_phase_seconds_total counter")
+        for child, phases in self.breakdown('child').items():
+            for phase, total in phases.items():
+                lines.append(f'eliis_child_phase_seconds_total{{child="{child}",phase="{phase}"}} {total}')
+        lines.append("# HELP eliis_date_phase_seconds_total Time spent per diary date and phase")
+        lines.append("# TYPE eliis_date_phase_seconds_total counter")
+        for date, phases in self.breakdown('date').items():
+            for phase, total in phases.items():
+                lines.append(f'eliis_date_phase_seconds_total{{date="{date}",phase="{phase}"}} {total}')
+        lines.append(f"eliis_run_seconds {round(time.time() - self.started_at, 3)}")
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def export(self, path):
+        """Write metrics; .prom/.txt means Prometheus text, anything else JSON lines"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if path.endswith(('.prom', '.txt')):
+            self.write_prometheus(path)
+        else:
+            self.write_jsonl(path)
+        return path
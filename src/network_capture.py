@@ -0,0 +1,131 @@
+import json
+from urllib.parse import urljoin
+from date_parsing import parse_estonian_date
+
+# Wraps fetch and XMLHttpRequest so JSON responses whose URL matches arguments[0] are
+# kept in window.__eliisCapture. Firefox has no performance/network log in Selenium,
+# so the page records its own API traffic
+INSTALL_HOOK_JS = """
+if (!window.__eliisCapture) {
+    const cap = window.__eliisCapture = {
+        pattern: new RegExp(arguments[0]), responses: [], pending: [], seen: new Set()
+    };
+    const isJson = (type) => (type || '').includes('json');
+    const keep = (url, body) => { cap.seen.add(url); cap.responses.push({url, body}); };
+    const originalFetch = window.fetch;
+    window.fetch = async function (...args) {
+        const response = await originalFetch.apply(this, args);
+        if (cap.pattern.test(response.url) && isJson(response.headers.get('content-type'))) {
+            cap.pending.push(response.clone().text().then((body) => keep(response.url, body), () => null));
+        }
+        return response;
+    };
+    const originalOpen = XMLHttpRequest.prototype.open;
+    XMLHttpRequest.prototype.open = function (...args) {
+        this.addEventListener('load', () => {
+            if (cap.pattern.test(this.responseURL) && isJson(this.getResponseHeader('content-type'))
+                    && (this.responseType === '' || this.responseType === 'text')) {
+                keep(this.responseURL, this.responseText);
+            }
+        });
+        return originalOpen.apply(this, args);
+    };
+}
+return true;
+"""
+
+# Requests the page made before the hook existed (the first diary page) are fetched
+# again through the hook, found via the Resource Timing entries
+SEED_JS = """
+const done = arguments[arguments.length - 1];
+const cap = window.__eliisCapture;
+const urls = performance.getEntriesByType('resource')
+    .filter((e) => ['fetch', 'xmlhttprequest'].includes(e.initiatorType))
+    .map((e) => e.name)
+    .filter((url) => cap.pattern.test(url) && !cap.seen.has(url));
+Promise.all([...new Set(urls)].map((url) => window.fetch(url, {credentials: 'include'}).catch(() => null)))
+    .then(() => done(urls.length), () => done(0));
+"""
+
+# Hands over (and forgets) everything recorded so far, once pending bodies are read
+DRAIN_JS = """
+const done = arguments[arguments.length - 1];
+const cap = window.__eliisCapture;
+if (!cap) { done(null); return; }
+const pending = cap.pending.splice(0);
+Promise.all(pending).then(() => done(cap.responses.splice(0)), () => done(cap.responses.splice(0)));
+"""
+
+DATE_KEYS = ('date', 'day', 'entry_date', 'diary_date', 'published_at', 'created_at')
+PHOTO_LIST_KEYS = ('photos', 'images', 'pictures', 'files', 'attachments', 'media')
+URL_KEYS = ('url', 'original', 'original_url', 'full', 'full_url', 'src', 'file_url', 'download_url')
+
+def photo_url(photo, base_url):
+    """Absolute URL of one photo object (or plain URL string)"""
+    if isinstance(photo, str):
+        return urljoin(base_url, photo)
+    if isinstance(photo, dict):
+        for key in URL_KEYS:
+            if isinstance(photo.get(key), str) and photo[key]:
+                return urljoin(base_url, photo[key])
+    return None
+
+def as_entry(node, base_url):
+    """Diary entry dict if node has a date and a photo list, else None"""
+    date = None
+    for key in DATE_KEYS:
+        if isinstance(node.get(key), str):
+            date = parse_estonian_date(node[key])
+            if date:
+                break
+    photos = next((node[key] for key in PHOTO_LIST_KEYS if isinstance(node.get(key), list)), None)
+    if date is None or photos is None:
+        return None
+    urls = [url for url in (photo_url(photo, base_url) for photo in photos) if url]
+    return {
+        'id': node.get('id'),
+        'date': date,
+        'urls': urls,
+        'photo_ids': [photo.get('id') for photo in photos if isinstance(photo, dict)],
+    }
+
+def parse_diary_entries(payload, base_url):
+    """Every diary entry found anywhere in a JSON response, in response order"""
+    entries = []
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            entry = as_entry(node, base_url)
+            if entry:
+                entries.append(entry)
+            else:
+                stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    return entries
+
+class NetworkCapture:
+    def __init__(self, driver, config):
+        """Record the diary API responses the page fetches and turn them into entries"""
+        self.driver = driver
+        self.pattern = config.get('capture_url_pattern', r'diary')
+        self.responses = 0
+
+    def install(self):
+        """Hook fetch/XHR in the current page and replay requests made before the hook"""
+        self.driver.execute_script(INSTALL_HOOK_JS, self.pattern)
+        return self.driver.execute_async_script(SEED_JS)
+
+    def drain(self):
+        """Diary entries from responses recorded since the last call"""
+        responses = self.driver.execute_async_script(DRAIN_JS) or []
+        entries = []
+        for response in responses:
+            try:
+                payload = json.loads(response['body'])
+            except (TypeError, ValueError):
+                continue
+            self.responses += 1
+            entries.extend(parse_diary_entries(payload, response['url']))
+        return entries
@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from firefox_session import get_firefox_driver, get_browser_peak_memory_mb, create_run_download_dir
+from download_session import DownloadSession
+
+# Files that belong to the running Firefox or are only caches
+PROFILE_IGNORE = shutil.ignore_patterns(
+    'lock', '.parentlock', 'parent.lock', 'cache2', 'startupCache',
+    'crashes', 'minidumps', 'sessionstore-backups', 'storage.sqlite-wal'
+)
+
+def copy_profile(profile_path, dest_root):
+    """Copy the authenticated Firefox profile so each browser gets its own"""
+    dest = os.path.join(dest_root, 'profile')
+    shutil.copytree(profile_path, dest, ignore=PROFILE_IGNORE)
+    return dest
+
+class ParallelRunner:
+    def __init__(self, config, workers, wait_stats=None, metrics=None):
+        """Run one isolated browser per child, up to `workers` at a time"""
+        self.config = config
+        self.workers = max(1, workers)
+        self.wait_stats = wait_stats
+        self.metrics = metrics
+        self.lock = threading.Lock()
+        self.sessions = []
+        self.drivers = []
+        self.cancelled = threading.Event()
+        # Set when a browser found eliis' login form; browsers not started yet are skipped
+        self.logged_out = threading.Event()
+
+    def run(self):
+        """Process all children in parallel, returns one result dict per child"""
+        children = self.config['children']
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(children))) as executor:
+            futures = [executor.submit(self._run_child, child) for child in children]
+            try:
+                return [future.result() for future in futures]
+            except KeyboardInterrupt:
+                self.cancel()
+                raise
+
+    def _run_child(self, child):
+        """Worker: own profile copy, browser, download dir and pipeline for one child"""
+        result = {'child': child['name'], 'downloaded': 0, 'seconds': 0.0, 'error': None, 'summary': [],
+                  'startup_seconds': None, 'peak_memory_mb': None}
+        if self.cancelled.is_set() or self.logged_out.is_set():
+            result['error'] = "cancelled"
+            return result
+
+        started = time.time()
+        work_dir = tempfile.mkdtemp(prefix=f"eliis-worker-{child['folder_name']}-")
+        driver = None
+        session = None
+        download_dir = None
+        try:
+            print(f"[{child['name']}] Copying Firefox profile...")
+            profile = copy_profile(self.config['firefox_profile_path'], work_dir)
+            download_dir = create_run_download_dir(self.config)
+
+            driver = get_firefox_driver(profile, download_dir=download_dir, config=self.config)
+            result['startup_seconds'] = driver.startup_seconds
+            child_config = dict(self.config, children=[child])
+            session = DownloadSession(driver, child_config, download_dir,
+                                      wait_stats=self.wait_stats, metrics=self.metrics)
+            with self.lock:
+                self.drivers.append(driver)
+                self.sessions.append(session)
+
+            # Stop before walking the diary if eliis wants a login
+            if not session.scraper.check_login():
+                self.logged_out.set()
+                raise RuntimeError("not logged in to eliis.eu")
+
+            result['downloaded'] = session.run()
+            result['summary'] = session.summary_lines()
+            result['peak_memory_mb'] = get_browser_peak_memory_mb(driver)
+        except (Exception, SystemExit) as e:
+            result['error'] = str(e) or e.__class__.__name__
+            if session:
+                result['downloaded'] = session.downloaded
+        finally:
+            if driver:
+                try:
+                    driver.quit()
+                except:
+                    pass
+            shutil.rmtree(work_dir, ignore_errors=True)
+            if download_dir:
+                shutil.rmtree(download_dir, ignore_errors=True)
+
+        result['seconds'] = time.time() - started
+        return result
+
+    def cancel(self):
+        """Stop all workers: drop queued downloads and close every browser"""
+        self.cancelled.set()
+        with self.lock:
+            sessions = list(self.sessions)
+            drivers = list(self.drivers)
+        for session in sessions:
+            session.cancel()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except:
+                pass
@@ -0,0 +1,143 @@
+import os
+import re
+import shutil
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from rate_control import is_retryable
+
+def link_file(existing_path, dest_path):
+    """Hard-link an existing file to dest_path (copy if linking isn't possible)"""
+    tmp_path = dest_path + '.link'
+    try:
+        os.link(existing_path, tmp_path)
+    except OSError:
+        shutil.copy2(existing_path, tmp_path)
+    os.replace(tmp_path, dest_path)
+
+def move_into_place(src_path, dest_path):
+    """Rename a finished file to dest_path; copy via a temp file if it's on another filesystem"""
+    try:
+        os.replace(src_path, dest_path)
+    except OSError:
+        tmp_path = dest_path + '.part'
+        shutil.move(src_path, tmp_path)
+        os.replace(tmp_path, dest_path)
+
+# photo_YYYYMMDD_NNN.jpg: older versions named photos by viewer position
+LEGACY_NAME = re.compile(r'^photo_\d{8}_\d{3}\.jpg$')
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def legacy_photos(folder):
+    """Index-named photos left in a date folder by older versions"""
+    try:
+        return sorted(name for name in os.listdir(folder) if LEGACY_NAME.match(name))
+    except OSError:
+        return []
+
+def find_legacy_duplicate(dest_path, size, sha256):
+    """Index-named photo next to dest_path with the same bytes, or None"""
+    folder = os.path.dirname(dest_path)
+    for name in legacy_photos(folder):
+        path = os.path.join(folder, name)
+        if os.path.getsize(path) == size and file_sha256(path) == sha256:
+            return path
+    return None
+
+class PhotoStore:
+    def __init__(self, downloader, manifest, metrics=None, archive=None, postprocessor=None):
+        """Put photos in place, reusing identical files already in the archive"""
+        self.downloader = downloader
+        self.manifest = manifest
+        self.metrics = metrics
+        # Optional ArchiveIndex kept in step with the files on disk
+        self.archive = archive
+        # Optional PostProcessor that gets every photo once it's in place
+        self.postprocessor = postprocessor
+
+    def store(self, child_id, date_str, url, dest_path):
+        """Returns (status, info) with status 'exists', 'linked', 'downloaded' or 'failed'"""
+        known = self.lookup(child_id, date_str, url, dest_path)
+        if known:
+            return known
+
+        started = time.time()
+        success, result = self.downloader.download(url, dest_path)
+        self.record_timing(child_id, date_str, time.time() - started, success)
+        if not success:
+            return 'failed', result
+        return self.finish(child_id, date_str, url, dest_path, result)
+
+    def lookup(self, child_id, date_str, url, dest_path):
+        """(status, info) if the photo needs no download, otherwise None"""
+        if os.path.exists(dest_path):
+            # Adopt files from earlier runs into the manifest, hashed so later duplicates link to them
+            size = os.path.getsize(dest_path)
+            sha256 = file_sha256(dest_path)
+            self.manifest.record_photo(child_id, date_str, url, dest_path, size, sha256)
+            self.placed(dest_path, date_str, size, sha256)
+            return 'exists', dest_path
+
+        # Same image object already downloaded for another child or date
+        existing = self.manifest.find_path_by_url(url)
+        if existing:
+            link_file(existing, dest_path)
+            self.record(child_id, date_str, url, dest_path, existing)
+            return 'linked', existing
+        return None
+
+    def finish(self, child_id, date_str, url, dest_path, result):
+        """Record a finished download, linking it to an identical file if there is one"""
+        # Different URL but identical bytes: keep one copy on disk
+        duplicate = (self.manifest.find_path_by_hash(result['sha256'], exclude_path=dest_path) or
+                     find_legacy_duplicate(dest_path, result['size'], result['sha256']))
+        if duplicate:
+            link_file(duplicate, dest_path)
+        self.manifest.record_photo(child_id, date_str, url, dest_path, result['size'], result['sha256'])
+        self.placed(dest_path, date_str, result['size'], result['sha256'])
+        return ('linked', duplicate) if duplicate else ('downloaded', result)
+
+    def placed(self, dest_path, date_str, size, sha256=None):
+        """Index a photo that is in place and hand it to post-processing"""
+        if self.archive:
+            self.archive.add_photo(dest_path, size, sha256)
+        if self.postprocessor:
+            self.postprocessor.submit(dest_path, date_str)
+
+    def record_timing(self, child_id, date_str, seconds, success):
+        if self.metrics:
+            self.metrics.record('http_download', seconds, child_id, date_str, ok=success)
+
+    def store_many(self, jobs):
+        """Store (child_id, date_str, url, dest_path) jobs concurrently, results keep job order"""
+        if not jobs:
+            return []
+        rate = self.downloader.rate
+        results = [None] * len(jobs)
+        pending = list(range(len(jobs)))
+        with ThreadPoolExecutor(max_workers=self.downloader.workers) as executor:
+            for attempt in range(rate.max_retries + 1):
+                if attempt:
+                    time.sleep(rate.retry_delay(attempt - 1))
+                futures = {i: executor.submit(self.store, *jobs[i]) for i in pending}
+                for i, future in futures.items():
+                    results[i] = future.result()
+                # Throttled or dropped downloads go round again
+                pending = [i for i in pending
+                           if results[i][0] == 'failed' and is_retryable(results[i][1])]
+                if not pending:
+                    break
+        return results
+
+    def record(self, child_id, date_str, url, dest_path, source_path):
+        """Record a linked file using the hash of its source"""
+        size = os.path.getsize(dest_path)
+        sha256 = self.manifest.hash_for_path(source_path)
+        self.manifest.record_photo(child_id, date_str, url, dest_path, size, sha256)
+        self.placed(dest_path, date_str, size, sha256)
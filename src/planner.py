@@ -0,0 +1,176 @@
+import os
+import re
+import json
+import glob
+from http_downloader import HttpDownloader
+from waits import Waiter, elements_present
+from scraper import EliisScraper, CARD_LOCATOR
+from arrow_download_handler import ArrowDownloadHandler
+
+def format_bytes(count):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if count < 1024 or unit == 'GB':
+            return f"{count:.0f} {unit}" if unit == 'B' else f"{count:.1f} {unit}"
+        count /= 1024
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m" if hours else f"{minutes}m {seconds:02d}s"
+
+class RunPlanner:
+    def __init__(self, driver, config):
+        """Walk the diaries like a run would, but only count: no viewer, no downloads, no writes"""
+        self.config = config
+        self.driver = driver
+        waiter = Waiter(driver, config)
+        self.scraper = EliisScraper(driver, config, waiter=waiter)
+        self.handler = ArrowDownloadHandler(driver, config, waiter=waiter, read_only=True)
+        self.manifest = self.handler.manifest
+        self.archive = self.handler.archive
+        self.sample_size = config.get('plan_sample_size', 20)
+
+    def walk_child(self, child):
+        """{date_str: [photos on the site, full-size URLs or None]} for the dates a run would visit"""
+        handler = self.handler
+        if not self.scraper.navigate_to_child_diary(child['id']):
+            print(f"Failed to navigate to {child['name']}'s diary")
+            return None
+        self.scraper.waiter.until('diary_cards', elements_present(CARD_LOCATOR))
+        handler.child_id = child['id']
+        handler.card_cursor = 0
+        handler.cards_per_date = {}
+        handler.capture = handler.start_capture()
+
+        synced_cutoff = handler.synced_cutoff()
+        since = handler.date_cutoff()
+        dates = {}
+        while True:
+            if not handler.capture and not handler.grid_mode:
+                # Count the thumbnails behind 'Kuva rohkem' too (grid mode expands by itself)
+                handler.expand_cards()
+            stop = False
+            for card, date in handler.read_entries():
+                date_str = date.strftime('%Y-%m-%d')
+                if handler.until and date_str > handler.until:
+                    continue
+                if (synced_cutoff and date_str < synced_cutoff) or (since and date_str < since):
+                    stop = True
+                    break
+                urls = card['urls']
+                if urls is None and handler.grid_mode:
+                    urls = handler.grid_urls(card)
+                count = len(urls) if urls is not None else card['thumbnail_count']
+                entry = dates.setdefault(date_str, [0, []])
+                entry[0] += count
+                if entry[1] is not None and urls is not None:
+                    entry[1].extend(urls)
+                else:
+                    entry[1] = None
+            if stop or not handler.load_more_dates():
+                return dates
+
+    def new_photos(self, child, date_str, count, urls):
+        """(new photo count, their URLs if known) for one date"""
+        if urls is not None:
+            new = [url for url in urls if not self.manifest.has_photo(child['id'], date_str, url)]
+            return len(new), new
+        have = max(self.manifest.date_photo_count(child['id'], date_str),
+                   self.archive.photo_count(child['folder_name'], date_str))
+        return max(count - have, 0), []
+
+    def sample_sizes(self, urls):
+        """Sizes of up to plan_sample_size of the new photos, asked from the server without downloading"""
+        if not urls:
+            return []
+        downloader = HttpDownloader(self.driver, self.config)
+        downloader.sync_cookies()
+        step = max(len(urls) // self.sample_size, 1)
+        sizes = []
+        try:
+            for url in urls[::step][:self.sample_size]:
+                size = self.remote_size(downloader.session, url)
+                if size:
+                    sizes.append(size)
+        finally:
+            downloader.close()
+        return sizes
+
+    @staticmethod
+    def remote_size(session, url):
+        """Content-Length from a HEAD, or the total from a one-byte range GET (signed URLs may refuse HEAD)"""
+        try:
+            response = session.head(url, allow_redirects=True, timeout=10)
+            if response.ok and response.headers.get('Content-Length'):
+                return int(response.headers['Content-Length'])
+            with session.get(url, headers={'Range': 'bytes=0-0'}, stream=True, timeout=10) as response:
+                match = re.search(r'/(\d+)$', response.headers.get('Content-Range', ''))
+                return int(match.group(1)) if match else None
+        except Exception:
+            return None
+
+    def measured_throughput(self):
+        """(photos per second, runs measured) from earlier runs' metrics in download_path/.metrics"""
+        photos = 0
+        seconds = 0.0
+        runs = 0
+        pattern = os.path.join(self.config.get('download_path', 'downloads'), '.metrics', '*.jsonl')
+        for path in sorted(glob.glob(pattern))[-self.config.get('plan_history_runs', 10):]:
+            run_photos = 0
+            run_seconds = None
+            try:
+                with open(path, 'r') as f:
+                    for line in f:
+                        record = json.loads(line)
+                        if record.get('type') == 'span' and record['ok'] and record['phase'] in ('http_download', 'move'):
+                            run_photos += 1
+                        elif record.get('type') == 'run':
+                            run_seconds = record['seconds']
+            except (OSError, ValueError, KeyError):
+                continue
+            if run_photos and run_seconds:
+                photos += run_photos
+                seconds += run_seconds
+                runs += 1
+        return (photos / seconds if seconds else None), runs
+
+    def run(self):
+        """Print per-child and total estimates"""
+        total_new = 0
+        known_urls = []
+        for child in self.config['children']:
+            print(f"\nPlanning {child['name']}...")
+            dates = self.walk_child(child)
+            if dates is None:
+                continue
+            child_new = 0
+            new_dates = []
+            for date_str, (count, urls) in sorted(dates.items()):
+                new, new_urls = self.new_photos(child, date_str, count, urls)
+                child_new += new
+                known_urls.extend(new_urls)
+                if new:
+                    new_dates.append(date_str)
+            total_new += child_new
+            span = f", {new_dates[0]} … {new_dates[-1]}" if new_dates else ""
+            print(f"  {len(dates)} dates to check, {sum(c for c, _ in dates.values())} photos on the site, "
+                  f"{child_new} new on {len(new_dates)} dates{span}")
+
+        print(f"\nPlan: {total_new} new photos")
+        if not total_new:
+            return total_new
+        sizes = self.sample_sizes(known_urls)
+        if sizes:
+            average, source = sum(sizes) / len(sizes), f"{len(sizes)} sampled from the server"
+        else:
+            average, source = self.manifest.average_photo_size(), "average of downloaded photos"
+        if average:
+            print(f"  ~{format_bytes(average * total_new)} to download ({format_bytes(average)}/photo, {source})")
+        else:
+            print("  Size unknown (no photo URLs to sample and nothing downloaded yet)")
+        rate, runs = self.measured_throughput()
+        if rate:
+            print(f"  ~{format_duration(total_new / rate)} at {rate:.2f} photos/s (measured over {runs} earlier run{'s' if runs != 1 else ''})")
+        else:
+            print("  Time unknown (no earlier run metrics in the .metrics folder)")
+        return total_new
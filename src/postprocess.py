@@ -0,0 +1,247 @@
+import os
+import json
+import time
+import struct
+import hashlib
+import threading
+import importlib.util
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+MARKER_FILE = '.postprocessed.json'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+def exif_app1(date):
+    """Minimal big-endian EXIF APP1 segment holding only DateTimeOriginal"""
+    stamp = date.strftime('%Y:%m:%d %H:%M:%S').encode() + b'\0'
+    # IFD0: one entry pointing at the Exif IFD (offset 26), which holds one
+    # DateTimeOriginal entry whose 20-byte value follows it (offset 44)
+    tiff = b'MM\0\x2a' + struct.pack('>I', 8)
+    tiff += struct.pack('>HHHII', 1, 0x8769, 4, 1, 26) + struct.pack('>I', 0)
+    tiff += struct.pack('>HHHII', 1, 0x9003, 2, len(stamp), 44) + struct.pack('>I', 0)
+    tiff += stamp
+    payload = b'Exif\0\0' + tiff
+    return b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload
+
+def jpeg_exif_insert_at(data):
+    """Offset to insert an EXIF segment at, or None if not a JPEG or it already has EXIF"""
+    if data[:2] != b'\xff\xd8':
+        return None
+    pos = 2
+    insert_at = 2
+    while pos + 4 <= len(data) and data[pos] == 0xff:
+        marker = data[pos + 1]
+        if marker == 0xda:
+            break
+        length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+        if marker == 0xe1 and data[pos + 4:pos + 10] == b'Exif\0\0':
+            return None
+        if marker == 0xe0:
+            # EXIF goes after the JFIF header
+            insert_at = pos + 2 + length
+        pos += 2 + length
+    return insert_at
+
+def stamp_exif_date(path, date_str, options):
+    """Give photos without EXIF the diary date as DateTimeOriginal; file time follows the diary date
+
+    Returns the new size and sha256 if the bytes changed. Photos hard-linked to
+    the same photo on another date are left alone: one date can't fit both, and
+    rewriting would split the link.
+    """
+    if os.stat(path).st_nlink > 1:
+        return None
+    date = datetime.strptime(date_str, '%Y-%m-%d').replace(hour=12)
+    with open(path, 'rb') as f:
+        data = f.read()
+    insert_at = jpeg_exif_insert_at(data)
+    changed = None
+    if insert_at is not None:
+        # New file + rename, so nothing ever reads a half-written photo
+        data = data[:insert_at] + exif_app1(date) + data[insert_at:]
+        tmp_path = path + '.exif'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        changed = {'size': len(data), 'sha256': hashlib.sha256(data).hexdigest()}
+    os.utime(path, (date.timestamp(), date.timestamp()))
+    return changed
+
+def resized_copy(path, dest_path, size, quality):
+    """Save a JPEG no larger than size x size (needs Pillow)"""
+    from PIL import Image, ImageOps
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    with Image.open(path) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        image.thumbnail((size, size))
+        tmp_path = dest_path + '.part'
+        image.save(tmp_path, 'JPEG', quality=quality, optimize=True)
+    os.replace(tmp_path, dest_path)
+
+def make_thumbnail(path, date_str, options):
+    """Small preview in <date>/.thumbs/"""
+    if not path.lower().endswith(IMAGE_EXTENSIONS):
+        return
+    name = os.path.splitext(os.path.basename(path))[0] + '.jpg'
+    dest_path = os.path.join(os.path.dirname(path), '.thumbs', name)
+    resized_copy(path, dest_path, options.get('thumbnail_size', 320), 80)
+
+def recompress_for_frame(path, date_str, options):
+    """Downscaled, re-compressed copy for a photo frame in frame_dir/<child>/"""
+    if not path.lower().endswith(IMAGE_EXTENSIONS):
+        return
+    child = os.path.basename(os.path.dirname(os.path.dirname(path)))
+    name = os.path.splitext(os.path.basename(path))[0] + '.jpg'
+    dest_path = os.path.join(options['frame_dir'], child, name)
+    resized_copy(path, dest_path, options.get('frame_max_size', 1920), options.get('frame_quality', 85))
+
+# name -> (function, optional module it needs); a function returns the photo's
+# new {'size', 'sha256'} if it rewrote the photo itself, else None
+PLUGINS = {
+    'exif_date': (stamp_exif_date, None),
+    'thumbnail': (make_thumbnail, 'PIL'),
+    'recompress': (recompress_for_frame, 'PIL'),
+}
+
+def run_task(path, date_str, plugins, options):
+    """Runs in a worker process: [(plugin, seconds, error or None, new file info or None)] for one photo"""
+    results = []
+    for name in plugins:
+        started = time.time()
+        try:
+            changed = PLUGINS[name][0](path, date_str, options)
+            results.append((name, time.time() - started, None, changed))
+        except Exception as e:
+            results.append((name, time.time() - started, str(e), None))
+    return results
+
+class PostProcessor:
+    def __init__(self, config, metrics=None, on_rewritten=None):
+        """Run post-processing plugins on finished photos in a process pool
+
+        Each date folder keeps a .postprocessed.json marker of the plugins
+        already applied per photo, so re-runs skip finished work.
+        on_rewritten(path, {'size', 'sha256'}) runs when a plugin changed a photo's bytes.
+        """
+        self.metrics = metrics
+        self.on_rewritten = on_rewritten
+        self.plugins = []
+        for name in config.get('postprocess', []):
+            if name not in PLUGINS:
+                print(f"Unknown post-processing step {name!r}, skipping it")
+            elif PLUGINS[name][1] and importlib.util.find_spec(PLUGINS[name][1]) is None:
+                print(f"Post-processing step {name!r} needs {PLUGINS[name][1]} (pip install Pillow), skipping it")
+            else:
+                self.plugins.append(name)
+        download_path = config.get('download_path', 'downloads')
+        self.options = {
+            'thumbnail_size': config.get('thumbnail_size', 320),
+            'frame_dir': config.get('frame_dir') or os.path.join(download_path, '.frame'),
+            'frame_max_size': config.get('frame_max_size', 1920),
+            'frame_quality': config.get('frame_quality', 85),
+        }
+        self.workers = config.get('postprocess_workers') or os.cpu_count() or 1
+        self.executor = None
+        self.lock = threading.Lock()
+        self.idle = threading.Condition(self.lock)
+        self.markers = {}
+        self.pending = set()
+        self.processed = 0
+        self.failed = 0
+
+    @property
+    def enabled(self):
+        return bool(self.plugins)
+
+    def marker(self, folder):
+        """{photo name: [plugins done]} for one date folder, loaded on first use"""
+        if folder not in self.markers:
+            try:
+                with open(os.path.join(folder, MARKER_FILE), 'r') as f:
+                    self.markers[folder] = json.load(f)
+            except (OSError, ValueError):
+                self.markers[folder] = {}
+        return self.markers[folder]
+
+    def save_marker(self, folder):
+        path = os.path.join(folder, MARKER_FILE)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.markers[folder], f, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def submit(self, path, date_str):
+        """Queue the plugins a photo hasn't had yet; returns immediately"""
+        if not self.plugins:
+            return False
+        folder, name = os.path.split(path)
+        with self.lock:
+            done = self.marker(folder).get(name, [])
+            todo = [plugin for plugin in self.plugins if plugin not in done]
+            if not todo or path in self.pending:
+                return False
+            if self.executor is None:
+                # Spawned workers: forking a process that runs download threads isn't safe
+                self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                    mp_context=multiprocessing.get_context('spawn'))
+            self.pending.add(path)
+        future = self.executor.submit(run_task, path, date_str, todo, self.options)
+        future.add_done_callback(lambda f: self._done(path, date_str, f))
+        return True
+
+    def _done(self, path, date_str, future):
+        folder, name = os.path.split(path)
+        if future.cancelled():
+            with self.lock:
+                self.pending.discard(path)
+                self.idle.notify_all()
+            return
+        try:
+            results = future.result()
+        except Exception as e:
+            results = [(None, 0.0, str(e), None)]
+        rewritten = [changed for _, _, _, changed in results if changed]
+        if rewritten and self.on_rewritten:
+            self.on_rewritten(path, rewritten[-1])
+        child = os.path.basename(os.path.dirname(folder))
+        with self.lock:
+            done = self.marker(folder).setdefault(name, [])
+            for plugin, seconds, error, _ in results:
+                if self.metrics and plugin:
+                    self.metrics.record(f'postprocess_{plugin}', seconds, child, date_str, ok=error is None)
+                if error:
+                    print(f"\n  Post-processing {plugin or 'worker'} failed for {name}: {error}")
+                elif plugin not in done:
+                    done.append(plugin)
+            if any(error for _, _, error, _ in results):
+                self.failed += 1
+            else:
+                self.processed += 1
+            try:
+                self.save_marker(folder)
+            except OSError as e:
+                print(f"\n  Could not save post-processing marker in {folder}: {e}")
+            self.pending.discard(path)
+            self.idle.notify_all()
+
+    def close(self):
+        """Wait for queued photos to finish and stop the worker processes"""
+        if self.executor is None:
+            return
+        with self.lock:
+            while self.pending:
+                self.idle.wait()
+        self.executor.shutdown(wait=True)
+        self.executor = None
+
+    def shutdown(self):
+        """Drop queued photos; ones already running finish"""
+        if self.executor is None:
+            return
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.executor = None
+
+    def summary_line(self):
+        line = f"Post-processing ({', '.join(self.plugins)}): {self.processed} photos"
+        return line + (f", {self.failed} failed" if self.failed else "")
@@ -0,0 +1,138 @@
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from metrics import percentile
+
+# Responses that mean "slow down and try again later"
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+def is_retryable(reason):
+    """Whether a failure from HttpDownloader.download is worth retrying"""
+    if isinstance(reason, str) and reason.startswith('not an image'):
+        # Login page or error document instead of a photo; retrying won't help
+        return False
+    if isinstance(reason, str) and reason.startswith('HTTP '):
+        try:
+            return int(reason.split()[1]) in RETRYABLE_STATUS
+        except (IndexError, ValueError):
+            return True
+    # Timeouts, connection resets, truncated bodies
+    return True
+
+def parse_retry_after(value):
+    """Seconds from a Retry-After header (delta-seconds form only)"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+class AdaptiveRateController:
+    def __init__(self, config):
+        """AIMD limit on concurrent downloads plus a shared pause after throttling"""
+        start = max(1, int(config.get('download_workers', 4)))
+        self.max_limit = max(start, int(config.get('max_download_workers', start * 2)))
+        self.limit = float(start)
+        self.slow_seconds = config.get('slow_response_seconds', 5)
+        self.base_delay = config.get('retry_base_delay', 1.0)
+        self.max_delay = config.get('retry_max_delay', 60)
+        self.max_retries = config.get('max_retries', 3)
+        self.condition = threading.Condition()
+        self.active = 0
+        self.paused_until = 0.0
+        self.consecutive_failures = 0
+        self.backoffs = 0
+        self.latencies = deque(maxlen=50)
+
+    def retry_delay(self, attempt):
+        """Exponential backoff with full jitter for the given attempt (0-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    @contextmanager
+    def slot(self):
+        """Hold one of the currently allowed download slots"""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self):
+        """Block while paused or while all allowed slots are in use"""
+        with self.condition:
+            while True:
+                pause = self.paused_until - time.time()
+                if pause > 0:
+                    self.condition.wait(pause)
+                elif self.active < int(self.limit):
+                    self.active += 1
+                    return
+                else:
+                    self.condition.wait()
+
+    def release(self):
+        with self.condition:
+            self.active -= 1
+            self.condition.notify_all()
+
+    def wait_if_paused(self):
+        """Sleep out a backoff pause before a page action"""
+        pause = self.paused_until - time.time()
+        if pause > 0:
+            time.sleep(pause)
+
+    def report_success(self, seconds):
+        """Healthy responses grow the limit by about one slot per window; slow ones shrink it"""
+        with self.condition:
+            self.latencies.append(seconds)
+            self.consecutive_failures = 0
+            if seconds > self.slow_seconds:
+                self._back_off(factor=0.75, pause=self.retry_delay(0))
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+    def report_failure(self, status=None, retry_after=None):
+        """Halve the limit and pause everyone after a 429/5xx, timeout or connection error"""
+        if status is not None and status not in RETRYABLE_STATUS:
+            return
+        with self.condition:
+            self.consecutive_failures += 1
+            pause = parse_retry_after(retry_after)
+            if pause is None:
+                pause = self.retry_delay(self.consecutive_failures)
+            self._back_off(factor=0.5, pause=min(pause, self.max_delay))
+            self.condition.notify_all()
+
+    def _back_off(self, factor, pause):
+        self.backoffs += 1
+        self.limit = max(1.0, self.limit * factor)
+        self.paused_until = max(self.paused_until, time.time() + pause)
+
+    def wait_timeout(self, default):
+        """Timeout for a single download: the default, stretched if recent ones were slow"""
+        with self.condition:
+            latencies = list(self.latencies)
+        if len(latencies) < 5:
+            return default
+        return max(default, min(self.max_delay, percentile(latencies, 95) * 4))
+
+    def call(self, action, label):
+        """Run a page action until it returns truthy, retrying with backoff"""
+        for attempt in range(self.max_retries + 1):
+            self.wait_if_paused()
+            try:
+                if action():
+                    return True
+            except Exception as e:
+                print(f"  {label} failed: {e}")
+            if attempt < self.max_retries:
+                delay = self.retry_delay(attempt)
+                print(f"  Retrying {label} in {delay:.1f}s...")
+                time.sleep(delay)
+        return False
+
+    def summary_line(self):
+        """Current concurrency limit and how often we backed off"""
+        return f"Download concurrency: {int(self.limit)} (max {self.max_limit}), backed off {self.backoffs} times"
@@ -1,52 +1,63 @@
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from datetime import datetime
-import time
-import re
+from date_parsing import parse_estonian_date
+from dom_extract import LOGIN_PAGE_JS
+from waits import Waiter, document_ready, elements_present, count_increased
+
+CARD_LOCATOR = (By.CSS_SELECTOR, "div.card.p-3.mb-3")
+THUMBNAIL_LOCATOR = (By.CSS_SELECTOR, "div.e3-image-thumbnail")
 
 class EliisScraper:
-    def __init__(self, driver, config):
+    def __init__(self, driver, config, waiter=None):
         """Initialize scraper with browser driver and config"""
         self.driver = driver
         self.config = config
         self.wait = WebDriverWait(driver, 10)
+        self.waiter = waiter or Waiter(driver, config)
+        self.metrics = self.waiter.metrics
     
     
     def navigate_to_child_diary(self, child_id):
         """Navigate directly to a child's diary page"""
-        diary_url = f"https://eliis.eu/child/{child_id}/diary"
-        print(f"Navigating to diary: {diary_url}")
+        with self.metrics.span('navigation'):
+            base_url = self.config.get('base_url', "https://eliis.eu").rstrip("/")
+            diary_url = f"{base_url}/child/{child_id}/diary"
+            print(f"Navigating to diary: {diary_url}")
+            
+            def load():
+                self.driver.get(diary_url)
+                # Wait for page to load
+                return self.waiter.until('navigation', document_ready())
+            
+            if self.waiter.rate.call(load, "navigation"):
+                return True
+            print(f"Error navigating to child diary: {diary_url} did not load")
+            return False
+        
+    def check_login(self):
+        """Open the first child's diary and make sure eliis didn't show its login form"""
+        if not self.navigate_to_child_diary(self.config['children'][0]['id']):
+            return False
         try:
-            self.driver.get(diary_url)
-            time.sleep(self.config.get('wait_time', 3))
-            # Wait for page to load
-            self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-            return True
-        except Exception as e:
-            print(f"Error navigating to child diary: {e}")
+            return not self.driver.execute_script(LOGIN_PAGE_JS)
+        except:
             return False
     
     def extract_date_from_page(self):
-        """Extract date from page elements"""
+        """Extract date from page elements, None if no element holds a readable date"""
         try:
-            date_elements = self.driver.find_elements(By.XPATH, "//time | //*[contains(@class, 'date')] | //*[contains(text(), '2025')] | //*[contains(text(), 'mai')]")
-            for elem in date_elements:
-                date_text = elem.text
-                for fmt in ["%d. %B %Y", "%d.%m.%Y", "%Y-%m-%d", "%d/%m/%Y"]:
-                    try:
-                        date_text = date_text.replace("jaanuar", "january").replace("veebruar", "february")
-                        date_text = date_text.replace("märts", "march").replace("aprill", "april")
-                        date_text = date_text.replace("mai", "may").replace("juuni", "june")
-                        date_text = date_text.replace("juuli", "july").replace("august", "august")
-                        date_text = date_text.replace("september", "september").replace("oktoober", "october")
-                        date_text = date_text.replace("november", "november").replace("detsember", "december")
-                        return datetime.strptime(date_text, fmt)
-                    except:
-                        continue
+            # Candidate texts in one round-trip instead of one call per element
+            texts = self.driver.execute_script("""
+                return Array.from(document.querySelectorAll('time, .text-muted, [class*="date"]'))
+                    .map(el => el.getAttribute('datetime') || el.textContent);
+            """)
         except:
-            pass
-        return datetime.now()
+            return None
+        for text in texts or []:
+            date = parse_estonian_date(text)
+            if date:
+                return date
+        return None
     
     def extract_date_from_url(self, url):
         """Extract date from page context"""
@@ -60,11 +71,11 @@ class EliisScraper:
             if show_more_buttons:
                 for btn in show_more_buttons:
                     if btn.is_displayed():
+                        before = len(self.driver.find_elements(*THUMBNAIL_LOCATOR))
                         self.driver.execute_script("arguments[0].scrollIntoView(true);", btn)
-                        time.sleep(0.5)
                         self.driver.execute_script("arguments[0].click();", btn)
                         print("  → Clicked 'Kuva rohkem' button")
-                        time.sleep(2)
+                        self.waiter.until('show_more_photos', count_increased(THUMBNAIL_LOCATOR, before))
                         return True
             return False
         except Exception as e:
@@ -74,19 +85,20 @@ class EliisScraper:
     
     def click_load_older_diaries(self):
         """Click 'Vaata vanemaid päevikuid' button to load older entries"""
-        try:
-            older_diary_btn = self.driver.find_element(By.CSS_SELECTOR, "button.position-relative")
-            if older_diary_btn and "Vaata vanemaid" in older_diary_btn.text:
-                self.driver.execute_script("arguments[0].scrollIntoView(true);", older_diary_btn)
-                time.sleep(0.5)
-                self.driver.execute_script("arguments[0].click();", older_diary_btn)
-                print("  → Clicked 'Vaata vanemaid päevikuid' button")
-                time.sleep(3)
-                return True
-            return False
-        except:
-            return False
-    
+        with self.metrics.span('pagination'):
+            try:
+                older_diary_btn = self.driver.find_element(By.CSS_SELECTOR, "button.position-relative")
+                if older_diary_btn and "Vaata vanemaid" in older_diary_btn.text:
+                    before = len(self.driver.find_elements(*CARD_LOCATOR))
+                    self.driver.execute_script("arguments[0].scrollIntoView(true);", older_diary_btn)
+                    self.driver.execute_script("arguments[0].click();", older_diary_btn)
+                    print("  → Clicked 'Vaata vanemaid päevikuid' button")
+                    self.waiter.until('load_older_diaries', count_increased(CARD_LOCATOR, before))
+                    return True
+                return False
+            except:
+                return False
+        
     def scroll_and_load_all_photos(self):
         """Scroll page to load all photos and click load more buttons"""
         photos_before = 0
@@ -94,26 +106,23 @@ class EliisScraper:
         max_attempts = self.config.get('max_scroll_attempts', 10)
         
         while scroll_attempts < max_attempts:
-            current_photos = len(self.driver.find_elements(By.CSS_SELECTOR, "div.e3-image-thumbnail"))
-            
             while self.click_show_more_photos():
-                time.sleep(1)
-                new_count = len(self.driver.find_elements(By.CSS_SELECTOR, "div.e3-image-thumbnail"))
+                new_count = len(self.driver.find_elements(*THUMBNAIL_LOCATOR))
                 print(f"  Photos after 'Kuva rohkem': {new_count}")
             
-            current_photos = len(self.driver.find_elements(By.CSS_SELECTOR, "div.e3-image-thumbnail"))
+            current_photos = len(self.driver.find_elements(*THUMBNAIL_LOCATOR))
             
             if current_photos == photos_before and scroll_attempts > 0:
                 if not self.click_load_older_diaries():
                     break
                 else:
-                    time.sleep(2)
                     continue
                 
             photos_before = current_photos
             
             self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(self.config.get('wait_time', 2))
+            self.waiter.until('scroll', count_increased(THUMBNAIL_LOCATOR, current_photos),
+                              timeout=self.config.get('wait_time', 2))
                 
             scroll_attempts += 1
             print(f"Loading photos... ({current_photos} found)")
@@ -127,11 +136,15 @@ class EliisScraper:
         
         print(f"\nFound {total} photos total")
         
+        # Same page, same date: read it once, not once per photo
+        date = self.extract_date_from_page()
+        if date is None:
+            print("Could not read a date on this page, not downloading")
+            return 0
+        
         for i, thumbnail in enumerate(thumbnail_divs, 1):
             print(f"[{i}/{total}] Downloading...", end='', flush=True)
             
-            date = self.extract_date_from_page()
-            
             success, result = download_handler.download_photo_via_click(
                 thumbnail, child_name, date, i
             )
@@ -141,8 +154,6 @@ class EliisScraper:
                 print(" ✓ Done!")
             else:
                 print(f" → Skipped ({result})")
-            
-            time.sleep(1)
         
         return downloaded
     
@@ -163,10 +174,10 @@ class EliisScraper:
                 continue
             
             # Wait for content to load
-            time.sleep(5)
+            self.waiter.until('diary_cards', elements_present(CARD_LOCATOR))
             
             if use_arrow_nav:
-                downloaded = download_handler.process_all_dates(child['folder_name'])
+                downloaded = download_handler.process_all_dates(child['folder_name'], child['id'])
             else:
                 self.scroll_and_load_all_photos()
                 downloaded = self.download_photos_with_buttons(
@@ -0,0 +1,27 @@
+import re
+from functools import lru_cache
+
+# (pattern, replacement) pairs turning a thumbnail URL into the full-size one.
+# Override with "thumbnail_url_rewrites" in config.json
+DEFAULT_REWRITES = [
+    (r'[_-](thumb|thumbnail|small|preview)(\.\w+)(\?.*)?$', r'\2\3'),
+    (r'/(thumbs?|thumbnails|small|preview)/', r'/'),
+    (r'(?<=[?&])(w|h|width|height|size|resize)=\d+(&|$)', r''),
+]
+# Separators left doubled by removed query parameters ('?&', '&&')
+EMPTY_PARAMS = re.compile(r'(?<=[?&])&+')
+
+@lru_cache(maxsize=None)
+def compile_rewrites(rewrites):
+    return [(re.compile(pattern), replacement) for pattern, replacement in rewrites]
+
+def full_size_url(thumbnail_url, rewrites=None):
+    """Full-size image URL for a thumbnail URL, or None if no rule applies"""
+    if not thumbnail_url:
+        return None
+    rules = compile_rewrites(tuple(tuple(rule) for rule in (rewrites or DEFAULT_REWRITES)))
+    url = thumbnail_url
+    for pattern, replacement in rules:
+        url = pattern.sub(replacement, url)
+    url = EMPTY_PARAMS.sub('', url).rstrip('?&')
+    return url if url != thumbnail_url else None
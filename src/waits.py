@@ -0,0 +1,126 @@
+import time
+import threading
+from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
+from selenium.webdriver.support.ui import WebDriverWait
+from metrics import RunMetrics
+from rate_control import AdaptiveRateController
+
+# Upper bounds (seconds) of the wait-time histogram buckets
+HISTOGRAM_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, float('inf')]
+
+class document_ready:
+    """Page finished loading"""
+    def __call__(self, driver):
+        return driver.execute_script("return document.readyState;") == "complete"
+
+class elements_present:
+    """At least one element matches the locator"""
+    def __init__(self, locator):
+        self.locator = locator
+
+    def __call__(self, driver):
+        return len(driver.find_elements(*self.locator)) > 0
+
+class count_increased:
+    """More elements match the locator than before (cards or thumbnails appended)"""
+    def __init__(self, locator, old_count):
+        self.locator = locator
+        self.old_count = old_count
+
+    def __call__(self, driver):
+        count = len(driver.find_elements(*self.locator))
+        return count if count > self.old_count else False
+
+class image_src_changed:
+    """Viewer shows a different image than before"""
+    def __init__(self, get_src, old_src):
+        self.get_src = get_src
+        self.old_src = old_src
+
+    def __call__(self, driver):
+        new_src = self.get_src()
+        return new_src if new_src and new_src != self.old_src else False
+
+class viewer_open:
+    """Viewer displays a full-size image"""
+    def __init__(self, get_src):
+        self.get_src = get_src
+
+    def __call__(self, driver):
+        return self.get_src() or False
+
+class viewer_closed:
+    """Viewer no longer displays a full-size image"""
+    def __init__(self, get_src):
+        self.get_src = get_src
+
+    def __call__(self, driver):
+        return not self.get_src()
+
+class WaitStats:
+    def __init__(self):
+        """Per-step wait-time histograms"""
+        self.lock = threading.Lock()
+        self.steps = {}
+
+    def record(self, step, seconds, timed_out=False):
+        """Add one wait duration to the step's histogram"""
+        with self.lock:
+            entry = self.steps.setdefault(step, {
+                'count': 0, 'total': 0.0, 'max': 0.0, 'timeouts': 0,
+                'buckets': [0] * len(HISTOGRAM_BUCKETS)
+            })
+            entry['count'] += 1
+            entry['total'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            if timed_out:
+                entry['timeouts'] += 1
+            for i, bound in enumerate(HISTOGRAM_BUCKETS):
+                if seconds <= bound:
+                    entry['buckets'][i] += 1
+                    break
+
+    def summary_lines(self):
+        """Human readable histogram per step, slowest total first"""
+        lines = []
+        labels = [f"≤{b}s" if b != float('inf') else f">{HISTOGRAM_BUCKETS[-2]}s" for b in HISTOGRAM_BUCKETS]
+        with self.lock:
+            steps = sorted(self.steps.items(), key=lambda item: item[1]['total'], reverse=True)
+            for step, entry in steps:
+                avg = entry['total'] / entry['count']
+                lines.append(
+                    f"{step}: {entry['count']} waits, total {entry['total']:.1f}s, "
+                    f"avg {avg:.2f}s, max {entry['max']:.2f}s, timeouts {entry['timeouts']}"
+                )
+                buckets = [f"{label}:{n}" for label, n in zip(labels, entry['buckets']) if n]
+                lines.append(f"    {' '.join(buckets)}")
+        return lines
+
+class Waiter:
+    def __init__(self, driver, config, stats=None, metrics=None, rate=None):
+        """WebDriverWait wrapper that returns as soon as a condition holds and times each step"""
+        self.driver = driver
+        self.poll = config.get('wait_poll_interval', 0.1)
+        self.stats = stats or WaitStats()
+        self.metrics = metrics or RunMetrics()
+        # Shared by page actions and downloads so throttling slows both
+        self.rate = rate or AdaptiveRateController(config)
+
+    def until(self, step, condition, timeout=10):
+        """Wait for condition, returns its value or None on timeout"""
+        started = time.time()
+        try:
+            result = WebDriverWait(
+                self.driver, timeout, poll_frequency=self.poll,
+                ignored_exceptions=(StaleElementReferenceException,)
+            ).until(condition)
+            self.record(step, time.time() - started)
+            return result
+        except TimeoutException:
+            self.record(step, time.time() - started, timed_out=True)
+            return None
+
+    def record(self, step, seconds, timed_out=False):
+        """Add a wait to the histogram and the run's spans"""
+        self.stats.record(step, seconds, timed_out)
+        self.metrics.record(f"wait.{step}", seconds, ok=not timed_out)
@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from http_downloader import HttpDownloader
+
+JPEG = b'\xff\xd8\xff\xe0' + b'\0' * 60
+
+class StubResponse:
+    def __init__(self, chunks, headers=None):
+        self.status_code = 200
+        self.chunks = chunks
+        self.headers = headers or {}
+
+    def iter_content(self, chunk_size):
+        return iter(self.chunks)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class StubSession:
+    def __init__(self, response):
+        self.response = response
+
+    def get(self, url, **kwargs):
+        return self.response
+
+    def close(self):
+        pass
+
+class HttpDownloaderTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.dest_path = os.path.join(self.dir.name, 'photo.jpg')
+        self.downloader = HttpDownloader(None, {})
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def download(self, chunks, headers=None):
+        self.downloader.session = StubSession(StubResponse(chunks, headers))
+        return self.downloader.download('https://example.cloudfront.net/photo.jpg', self.dest_path)
+
+    def test_empty_body_is_rejected(self):
+        for headers in ({}, {'Content-Length': '0'}):
+            success, reason = self.download([], headers)
+            self.assertFalse(success)
+            self.assertIn('empty', reason)
+            self.assertFalse(os.path.exists(self.dest_path))
+
+    def test_signature_split_over_short_chunks(self):
+        chunks = [JPEG[:1], JPEG[1:3], JPEG[3:20], JPEG[20:]]
+        success, info = self.download(chunks, {'Content-Length': str(len(JPEG))})
+        self.assertTrue(success)
+        self.assertEqual(info['size'], len(JPEG))
+        with open(self.dest_path, 'rb') as f:
+            self.assertEqual(f.read(), JPEG)
+
+    def test_html_split_over_short_chunks_is_rejected(self):
+        page = b'<!DOCTYPE html><html>login</html>'
+        success, reason = self.download([page[:2], page[2:]])
+        self.assertFalse(success)
+        self.assertIn('not an image', reason)
+        self.assertFalse(os.path.exists(self.dest_path))
+
+if __name__ == '__main__':
+    unittest.main()
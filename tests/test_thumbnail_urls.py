@@ -0,0 +1,29 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from thumbnail_urls import full_size_url
+
+BASE = 'https://d1.cloudfront.net/photos/abc.jpg'
+
+class FullSizeUrlTest(unittest.TestCase):
+    def test_adjacent_size_parameters_are_all_dropped(self):
+        self.assertEqual(full_size_url(BASE + '?w=200&h=200'), BASE)
+        self.assertEqual(full_size_url(BASE + '?width=200&height=150&resize=1'), BASE)
+
+    def test_other_parameters_are_kept(self):
+        self.assertEqual(full_size_url(BASE + '?w=200&h=200&sig=x1'), BASE + '?sig=x1')
+        self.assertEqual(full_size_url(BASE + '?sig=x1&w=200&h=200'), BASE + '?sig=x1')
+        self.assertEqual(full_size_url(BASE + '?sig=x1&w=200&exp=9'), BASE + '?sig=x1&exp=9')
+
+    def test_parameter_names_containing_a_size_key_are_kept(self):
+        self.assertIsNone(full_size_url(BASE + '?show=1&sizes=2'))
+
+    def test_thumbnail_suffix_and_folder(self):
+        self.assertEqual(full_size_url('https://d1.cloudfront.net/photos/abc_thumb.jpg?w=200'), BASE)
+        self.assertEqual(full_size_url('https://d1.cloudfront.net/photos/thumbs/abc.jpg'), BASE)
+
+if __name__ == '__main__':
+    unittest.main()